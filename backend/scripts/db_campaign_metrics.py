@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Campaign Metrics Utility
+Recompute campaign ROI, cost per view and engagement in bulk with NumPy
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+console = Console()
+
+ROLLING_WINDOWS = (7, 30)
+
+# Largest magnitudes the campaign_performance DECIMAL columns can hold
+CPV_LIMIT = 9999.9999          # cost_per_view DECIMAL(8,4)
+ROI_LIMIT = 9999.9999          # return_on_investment DECIMAL(8,4)
+ENGAGEMENT_LIMIT = 9.9999      # engagement_rate DECIMAL(5,4)
+
+CAMPAIGNS_QUERY = """
+    SELECT campaign_id, start_date, end_date, COALESCE(budget, 0)::float8 AS budget
+    FROM campaigns.campaigns
+    WHERE status = ANY($1::text[])
+      AND start_date <= $3
+      AND (end_date IS NULL OR end_date >= $2)
+      AND ($4::uuid IS NULL OR campaign_id = $4)
+"""
+
+# Daily totals of the videos in each campaign; the partition key bound keeps
+# the scan to the partitions inside the window.
+DAILY_TOTALS_QUERY = """
+    SELECT cv.campaign_id,
+           va.date,
+           SUM(va.views)::int8 AS views,
+           SUM(va.watch_time_minutes)::int8 AS watch_time,
+           SUM(va.estimated_revenue)::float8 AS revenue,
+           SUM(va.likes + va.comments + va.shares)::int8 AS interactions,
+           SUM(va.subscribers_gained)::int8 AS subscribers
+    FROM campaigns.campaign_videos cv
+    JOIN analytics.video_analytics va ON va.video_id = cv.video_id
+    WHERE cv.campaign_id = ANY($1::uuid[])
+      AND va.date BETWEEN $2 AND $3
+    GROUP BY cv.campaign_id, va.date
+"""
+
+STAGE_COLUMNS = [
+    "campaign_id", "date", "total_views", "total_watch_time", "total_revenue",
+    "cost_per_view", "return_on_investment", "subscriber_growth", "engagement_rate",
+]
+
+UPSERT_QUERY = """
+    INSERT INTO campaigns.campaign_performance
+        (campaign_id, date, total_views, total_watch_time, total_revenue,
+         cost_per_view, return_on_investment, subscriber_growth, engagement_rate)
+    SELECT campaign_id, date, total_views, total_watch_time, round(total_revenue::numeric, 2),
+           round(cost_per_view::numeric, 4), round(return_on_investment::numeric, 4),
+           subscriber_growth, round(engagement_rate::numeric, 4)
+    FROM campaign_performance_stage
+    ON CONFLICT (campaign_id, date) DO UPDATE SET
+        total_views = EXCLUDED.total_views,
+        total_watch_time = EXCLUDED.total_watch_time,
+        total_revenue = EXCLUDED.total_revenue,
+        cost_per_view = EXCLUDED.cost_per_view,
+        return_on_investment = EXCLUDED.return_on_investment,
+        subscriber_growth = EXCLUDED.subscriber_growth,
+        engagement_rate = EXCLUDED.engagement_rate
+"""
+
+
+def safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0 where the denominator is 0"""
+    out = np.zeros(np.broadcast(numerator, denominator).shape, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sum over the last `window` days along the date axis"""
+    cumulative = np.cumsum(values, axis=1, dtype=np.float64)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, window:] = cumulative[:, :-window]
+    return cumulative - shifted
+
+
+def compute_metrics(start: np.ndarray, end: np.ndarray, budget: np.ndarray,
+                    day: np.ndarray, totals: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Daily and rolling campaign metrics over a campaigns x days grid
+
+    start, end and budget hold one value per campaign (dates as ordinals,
+    end already defaulted for open-ended campaigns); day holds the grid's
+    date ordinals and every totals array is campaigns x days. The budget is
+    spread evenly over the campaign's days to give a daily spend.
+    """
+    active = (day[None, :] >= start[:, None]) & (day[None, :] <= end[:, None])
+    duration = np.maximum(end - start + 1, 1)
+    spend = np.where(active, (budget / duration)[:, None], 0.0)
+
+    views = totals["views"]
+    metrics = {
+        "active": active,
+        "spend": spend,
+        "cost_per_view": np.clip(safe_divide(spend, views), 0, CPV_LIMIT),
+        "return_on_investment": np.clip(safe_divide(totals["revenue"] - spend, spend), -ROI_LIMIT, ROI_LIMIT),
+        "engagement_rate": np.clip(safe_divide(totals["interactions"], views), 0, ENGAGEMENT_LIMIT),
+    }
+
+    for window in ROLLING_WINDOWS:
+        window_views = rolling_sum(views, window)
+        window_spend = rolling_sum(spend, window)
+        window_revenue = rolling_sum(totals["revenue"], window)
+        metrics[f"cost_per_view_{window}d"] = safe_divide(window_spend, window_views)
+        metrics[f"return_on_investment_{window}d"] = safe_divide(window_revenue - window_spend, window_spend)
+        metrics[f"engagement_rate_{window}d"] = safe_divide(rolling_sum(totals["interactions"], window), window_views)
+
+    return metrics
+
+
+class CampaignMetricsEngine:
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.timings: Dict[str, float] = {}
+
+    async def recompute(self, since: date, until: date, statuses: List[str],
+                        campaign_id: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Load, compute and upsert campaign_performance for every matching campaign"""
+        conn = await asyncpg.connect(self.database_url)
+        try:
+            started = time.perf_counter()
+            campaigns = await conn.fetch(CAMPAIGNS_QUERY, statuses, since, until, campaign_id)
+            if not campaigns:
+                return {"campaigns": 0, "rows": 0, "latest": []}
+            ids = [r["campaign_id"] for r in campaigns]
+            daily = await conn.fetch(DAILY_TOTALS_QUERY, ids, since, until)
+            self.timings["load"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            days = np.arange(since.toordinal(), until.toordinal() + 1)
+            index = {campaign: i for i, campaign in enumerate(ids)}
+
+            start = np.array([r["start_date"].toordinal() for r in campaigns])
+            end = np.array([(r["end_date"] or until).toordinal() for r in campaigns])
+            budget = np.array([r["budget"] for r in campaigns], dtype=np.float64)
+
+            rows_c = np.array([index[r["campaign_id"]] for r in daily], dtype=np.intp)
+            rows_d = np.array([r["date"].toordinal() for r in daily], dtype=np.intp) - days[0]
+            totals = {}
+            for column in ("views", "watch_time", "revenue", "interactions", "subscribers"):
+                grid = np.zeros((len(ids), len(days)), dtype=np.float64)
+                grid[rows_c, rows_d] = np.array([r[column] or 0 for r in daily], dtype=np.float64)
+                totals[column] = grid
+
+            metrics = compute_metrics(start, end, budget, days, totals)
+            self.timings["compute"] = time.perf_counter() - started
+
+            cells_c, cells_d = np.nonzero(metrics["active"])
+            written = 0
+            if not dry_run and len(cells_c):
+                started = time.perf_counter()
+                records = zip(
+                    [ids[c] for c in cells_c.tolist()],
+                    [date.fromordinal(int(days[d])) for d in cells_d.tolist()],
+                    totals["views"][cells_c, cells_d].astype(np.int64).tolist(),
+                    totals["watch_time"][cells_c, cells_d].astype(np.int64).tolist(),
+                    totals["revenue"][cells_c, cells_d].tolist(),
+                    metrics["cost_per_view"][cells_c, cells_d].tolist(),
+                    metrics["return_on_investment"][cells_c, cells_d].tolist(),
+                    totals["subscribers"][cells_c, cells_d].astype(np.int64).tolist(),
+                    metrics["engagement_rate"][cells_c, cells_d].tolist(),
+                )
+                async with conn.transaction():
+                    await conn.execute("""
+                        CREATE TEMP TABLE campaign_performance_stage (
+                            campaign_id UUID, date DATE, total_views BIGINT, total_watch_time BIGINT,
+                            total_revenue FLOAT8, cost_per_view FLOAT8, return_on_investment FLOAT8,
+                            subscriber_growth INTEGER, engagement_rate FLOAT8
+                        ) ON COMMIT DROP
+                    """)
+                    await conn.copy_records_to_table(
+                        "campaign_performance_stage", records=records, columns=STAGE_COLUMNS
+                    )
+                    status = await conn.execute(UPSERT_QUERY)
+                    written = int(status.split()[-1])
+                self.timings["write"] = time.perf_counter() - started
+
+            # Rolling figures as of the last active day of each campaign
+            last_day = np.clip(end, days[0], days[-1]) - days[0]
+            latest = []
+            for i, campaign in enumerate(ids):
+                entry = {"campaign_id": str(campaign), "date": date.fromordinal(int(days[last_day[i]])).isoformat()}
+                for window in ROLLING_WINDOWS:
+                    for name in ("return_on_investment", "cost_per_view", "engagement_rate"):
+                        entry[f"{name}_{window}d"] = round(float(metrics[f"{name}_{window}d"][i, last_day[i]]), 4)
+                latest.append(entry)
+
+            return {"campaigns": len(ids), "cells": int(len(cells_c)), "rows": written, "latest": latest}
+        finally:
+            await conn.close()
+
+    def display_results(self, report: Dict[str, Any]):
+        """Display rolling metrics and phase timings"""
+        table = Table(title="Campaign Metrics (rolling)")
+        table.add_column("Campaign", style="cyan")
+        table.add_column("As of")
+        for window in ROLLING_WINDOWS:
+            table.add_column(f"ROI {window}d", justify="right")
+            table.add_column(f"CPV {window}d", justify="right")
+            table.add_column(f"Eng {window}d", justify="right")
+        for entry in report["latest"][:50]:
+            cells = []
+            for window in ROLLING_WINDOWS:
+                cells += [
+                    f"{entry[f'return_on_investment_{window}d']:.2%}",
+                    f"{entry[f'cost_per_view_{window}d']:.4f}",
+                    f"{entry[f'engagement_rate_{window}d']:.2%}",
+                ]
+            table.add_row(entry["campaign_id"][:8], entry["date"], *cells)
+        console.print(table)
+        if len(report["latest"]) > 50:
+            console.print(f"[dim]... and {len(report['latest']) - 50} more campaigns[/dim]")
+
+        console.print(Panel(
+            f"[cyan]Campaigns:[/cyan] {report['campaigns']}\n"
+            f"[cyan]Campaign-days:[/cyan] {report.get('cells', 0)}\n"
+            f"[cyan]Rows upserted:[/cyan] {report['rows']}\n"
+            + "\n".join(f"[cyan]{phase}:[/cyan] {seconds:.3f}s" for phase, seconds in self.timings.items()),
+            title="Recompute Summary",
+            border_style="green"
+        ))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Campaign Metrics Utility")
+    parser.add_argument("--days", "-d", type=int, default=90, help="Recompute the last N days")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="Last day to recompute (default today)")
+    parser.add_argument("--campaign-id", help="Recompute a single campaign")
+    parser.add_argument("--statuses", default="active", help="Comma-separated campaign statuses to include")
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing campaign_performance")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    until = args.until or date.today()
+    since = until - timedelta(days=args.days - 1)
+    statuses = [s.strip() for s in args.statuses.split(",") if s.strip()]
+
+    engine = CampaignMetricsEngine(database_url)
+
+    try:
+        report = await engine.recompute(since, until, statuses, args.campaign_id, args.dry_run)
+        report.update({
+            "timestamp": datetime.now().isoformat(),
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "dry_run": args.dry_run,
+            "timings": engine.timings,
+        })
+        engine.display_results(report)
+
+        # Save results to file
+        output_file = f"campaign_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        console.print(f"\n[green]Results saved to {output_file}[/green]")
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,33 +8,185 @@ import argparse
 import asyncio
 import json
 import sys
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import asyncpg
-import pandas as pd
 from rich.console import Console
 from rich.table import Table
-from rich.syntax import Syntax
 from rich.panel import Panel
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+# Query latencies are served by debug_shell.py --metrics-port; a one-shot run discards them
+from metrics import observe_query
+
 load_dotenv()
 
 console = Console()
 
+EXPORT_FORMATS = {".csv": "csv", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow", ".parquet": "parquet"}
+
+# One-dimensional array type OIDs and the OID of their element type
+ARRAY_ELEMENT_OIDS = {
+    1000: 16, 1016: 20, 1005: 21, 1007: 23, 1028: 26, 1021: 700, 1022: 701,
+    1182: 1082, 1115: 1114, 1185: 1184, 1003: 19, 1009: 25, 1014: 1042, 1015: 1043,
+    1231: 1700, 199: 114, 3807: 3802,
+}
+
+# Every user table and leaf partition with the inputs for a heap bloat estimate
+HEALTH_TABLES_QUERY = """
+SELECT
+    s.relid, s.schemaname, s.relname, par.relname AS parent,
+    c.relpages, c.reltuples, c.reloptions,
+    pg_table_size(c.oid) AS table_bytes,
+    pg_indexes_size(c.oid) AS index_bytes,
+    s.n_live_tup, s.n_dead_tup, s.n_mod_since_analyze,
+    s.n_tup_upd, s.n_tup_hot_upd, s.n_tup_del,
+    s.last_vacuum, s.last_autovacuum, s.last_analyze, s.last_autoanalyze,
+    s.autovacuum_count, s.autoanalyze_count,
+    age(c.relfrozenxid) AS xid_age,
+    w.datawidth, w.ncols
+FROM pg_stat_user_tables s
+JOIN pg_class c ON c.oid = s.relid
+LEFT JOIN pg_inherits inh ON inh.inhrelid = c.oid
+LEFT JOIN pg_class par ON par.oid = inh.inhparent
+LEFT JOIN (
+    SELECT schemaname, tablename,
+           SUM((1 - null_frac) * avg_width) AS datawidth, COUNT(*) AS ncols
+    FROM pg_stats WHERE NOT inherited
+    GROUP BY schemaname, tablename
+) w ON w.schemaname = s.schemaname AND w.tablename = s.relname
+WHERE c.relkind IN ('r', 'm')
+"""
+
+# Every index of those tables with the average width of its key columns;
+# expression indexes have no per-column stats and get no estimate
+HEALTH_INDEXES_QUERY = """
+SELECT
+    i.indrelid AS relid, ic.relname AS index_name, am.amname,
+    ic.relpages, ic.reltuples, ic.reloptions,
+    pg_relation_size(ic.oid) AS index_bytes,
+    i.indexprs IS NOT NULL AS has_expressions,
+    i.indnatts AS ncols,
+    w.datawidth, w.nstats,
+    COALESCE(ui.idx_scan, 0) AS idx_scan
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_class tc ON tc.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = tc.relnamespace
+JOIN pg_am am ON am.oid = ic.relam
+LEFT JOIN pg_stat_user_indexes ui ON ui.indexrelid = i.indexrelid
+LEFT JOIN LATERAL (
+    SELECT SUM((1 - st.null_frac) * st.avg_width) AS datawidth, COUNT(st.attname) AS nstats
+    FROM pg_attribute a
+    LEFT JOIN pg_stats st
+      ON st.schemaname = n.nspname AND st.tablename = tc.relname
+     AND st.attname = a.attname AND NOT st.inherited
+    WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+) w ON true
+WHERE tc.relkind IN ('r', 'm')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema', 'pg_toast')
+"""
+
+HEALTH_SETTINGS_QUERY = """
+SELECT name, setting FROM pg_settings
+WHERE name LIKE 'autovacuum%' OR name IN ('block_size', 'vacuum_cost_limit', 'track_counts')
+"""
+
+HEALTH_WORKERS_QUERY = """
+SELECT p.relid::regclass::text AS relation, p.phase, a.query_start
+FROM pg_stat_progress_vacuum p
+JOIN pg_stat_activity a ON a.pid = p.pid
+"""
+
+# Per-table reloptions that override the global autovacuum settings
+AUTOVACUUM_RELOPTIONS = [
+    "autovacuum_enabled",
+    "autovacuum_vacuum_threshold",
+    "autovacuum_vacuum_scale_factor",
+    "autovacuum_analyze_threshold",
+    "autovacuum_analyze_scale_factor",
+    "autovacuum_vacuum_cost_limit",
+    "autovacuum_vacuum_cost_delay",
+]
+
+BLOAT_MIN_BYTES = 10 * 1024 * 1024
+
+
+def parse_reloptions(reloptions: Optional[List[str]]) -> Dict[str, str]:
+    return dict(option.split("=", 1) for option in reloptions or [])
+
+
+def estimate_heap_pages(reltuples: float, datawidth: float, ncols: int,
+                        fillfactor: int, block_size: int) -> int:
+    """Pages a freshly packed heap would need for the current row estimate"""
+    header = 23 + (ncols + 7) // 8                 # tuple header plus null bitmap
+    tuple_bytes = -(-header // 8) * 8 + -(-int(datawidth) // 8) * 8 + 4  # MAXALIGN + line pointer
+    usable = (block_size - 24) * fillfactor / 100  # page header
+    return max(1, int(-(-reltuples * tuple_bytes // usable)))
+
+
+def estimate_btree_pages(reltuples: float, datawidth: float, fillfactor: int, block_size: int) -> int:
+    """Leaf pages a freshly built btree would need, plus the metapage"""
+    tuple_bytes = 8 + -(-int(datawidth) // 8) * 8 + 4  # IndexTupleData, MAXALIGN, line pointer
+    usable = (block_size - 24 - 16) * fillfactor / 100  # page header and btree special space
+    return int(-(-reltuples * tuple_bytes // usable)) + 1
+
+
+def arrow_column(type_code: int, precision: Optional[int], scale: Optional[int]) -> Tuple[Any, Optional[Callable]]:
+    """Arrow type and value converter for a PostgreSQL column type OID
+
+    The schema is fixed from the cursor description rather than inferred from
+    the first batch, so an all-NULL first batch cannot break later ones.
+    """
+    import pyarrow as pa
+
+    simple = {
+        16: pa.bool_(),          # bool
+        20: pa.int64(),          # int8
+        21: pa.int16(),          # int2
+        23: pa.int32(),          # int4
+        26: pa.int64(),          # oid
+        700: pa.float32(),       # float4
+        701: pa.float64(),       # float8
+        1082: pa.date32(),       # date
+        1114: pa.timestamp("us"),              # timestamp
+        1184: pa.timestamp("us", tz="UTC"),    # timestamptz
+        19: pa.string(), 25: pa.string(), 1042: pa.string(), 1043: pa.string(),  # name, text, char, varchar
+    }
+    if type_code in simple:
+        return simple[type_code], None
+    if type_code == 1700:  # numeric
+        if precision and 0 < precision <= 38:
+            return pa.decimal128(precision, scale or 0), None
+        return pa.float64(), lambda v: float(v) if v is not None else None
+    if type_code in (114, 3802):  # json, jsonb (psycopg2 hands back the parsed value)
+        return pa.string(), lambda v: json.dumps(v, default=str) if v is not None else None
+    if type_code in ARRAY_ELEMENT_OIDS:
+        element_type, convert = arrow_column(ARRAY_ELEMENT_OIDS[type_code], None, None)
+        if convert is None:
+            return pa.list_(element_type), None
+        return pa.list_(element_type), lambda v: [convert(e) for e in v] if v is not None else None
+    return pa.string(), lambda v: str(v) if v is not None else None
+
 
 class DatabaseDebugger:
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, echo: bool = True, pool_pre_ping: bool = False):
+        # SQLAlchemy takes longer to import than most lookups take to run,
+        # so it is loaded with the first debugger rather than with the module
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
         self.database_url = database_url
-        self.engine = create_engine(database_url, echo=True)
+        self.engine = create_engine(database_url, echo=echo, pool_pre_ping=pool_pre_ping)
         self.Session = sessionmaker(bind=self.engine)
         
-    async def analyze_query(self, query: str, explain: bool = True) -> Dict[str, Any]:
+    async def analyze_query(self, query: str, explain: bool = True,
+                            params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze a SQL query with execution plan"""
+        from sqlalchemy import text
+
         result = {
             "query": query,
             "timestamp": datetime.now().isoformat(),
@@ -49,7 +201,7 @@ class DatabaseDebugger:
                 # Get execution plan
                 if explain:
                     explain_query = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"
-                    plan_result = session.execute(text(explain_query))
+                    plan_result = session.execute(text(explain_query), params or {})
                     result["execution_plan"] = plan_result.fetchone()[0]
                     
                     # Extract key metrics
@@ -63,8 +215,10 @@ class DatabaseDebugger:
                     }
                 
                 # Execute actual query
-                query_result = session.execute(text(query))
+                started = time.perf_counter()
+                query_result = session.execute(text(query), params or {})
                 rows = query_result.fetchall()
+                observe_query(query, time.perf_counter() - started)
                 columns = query_result.keys()
                 
                 # Convert to list of dicts
@@ -79,8 +233,82 @@ class DatabaseDebugger:
             
         return result
     
+    async def export_query(self, query: str, output_file: str, fmt: str,
+                           batch_size: int = 50000) -> Dict[str, Any]:
+        """Stream the full result set of a query to CSV, Arrow IPC or Parquet
+
+        CSV goes through COPY ... TO STDOUT; Arrow and Parquet read from a
+        server-side cursor one record batch at a time, so memory stays
+        bounded by the batch size whatever the size of the result.
+        """
+        query = query.strip().rstrip(";")
+        started = time.perf_counter()
+        raw_conn = self.engine.raw_connection()
+
+        try:
+            if fmt == "csv":
+                with raw_conn.cursor() as cursor, open(output_file, 'w', newline='') as f:
+                    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+                    rows = cursor.rowcount if cursor.rowcount >= 0 else None
+                raw_conn.commit()
+            else:
+                try:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                except ImportError:
+                    raise RuntimeError("pyarrow is required for Arrow/Parquet export (pip install pyarrow)")
+
+                rows = 0
+                writer = None
+                cursor = raw_conn.cursor(name=f"ytempire_export_{int(started)}")
+                cursor.itersize = batch_size
+                try:
+                    cursor.execute(query)
+                    while True:
+                        batch = cursor.fetchmany(batch_size)
+                        if writer is None:
+                            columns = [arrow_column(d.type_code, d.precision, d.scale) for d in cursor.description]
+                            schema = pa.schema([
+                                pa.field(d.name, arrow_type)
+                                for d, (arrow_type, _) in zip(cursor.description, columns)
+                            ])
+                            if fmt == "parquet":
+                                writer = pq.ParquetWriter(output_file, schema, compression="zstd")
+                            else:
+                                writer = pa.ipc.new_file(output_file, schema)
+                        if not batch:
+                            break
+
+                        arrays = []
+                        for i, (arrow_type, convert) in enumerate(columns):
+                            values = [row[i] for row in batch]
+                            if convert:
+                                values = [convert(v) for v in values]
+                            arrays.append(pa.array(values, type=arrow_type))
+                        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                        rows += len(batch)
+                        console.print(f"[dim]  {rows} rows written[/dim]")
+                finally:
+                    if writer is not None:
+                        writer.close()
+                    cursor.close()
+                raw_conn.commit()
+        finally:
+            raw_conn.close()
+
+        seconds = time.perf_counter() - started
+        return {
+            "output_file": output_file,
+            "format": fmt,
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if rows and seconds > 0 else None,
+            "bytes": os.path.getsize(output_file),
+        }
+
     def display_results(self, analysis: Dict[str, Any]):
         """Display query analysis results in a formatted way"""
+        from rich.syntax import Syntax
         
         # Display query
         console.print(Panel(
@@ -184,11 +412,11 @@ class DatabaseDebugger:
     async def analyze_table_stats(self, schema: str, table: str):
         """Analyze table statistics and indexes"""
         # Table size and statistics
-        size_query = f"""
+        size_query = """
         SELECT 
-            pg_size_pretty(pg_total_relation_size('{schema}.{table}')) as total_size,
-            pg_size_pretty(pg_relation_size('{schema}.{table}')) as table_size,
-            pg_size_pretty(pg_indexes_size('{schema}.{table}')) as indexes_size,
+            pg_size_pretty(pg_total_relation_size(relid)) as total_size,
+            pg_size_pretty(pg_relation_size(relid)) as table_size,
+            pg_size_pretty(pg_indexes_size(relid)) as indexes_size,
             n_live_tup as live_rows,
             n_dead_tup as dead_rows,
             last_vacuum,
@@ -196,22 +424,24 @@ class DatabaseDebugger:
             last_analyze,
             last_autoanalyze
         FROM pg_stat_user_tables
-        WHERE schemaname = '{schema}' AND relname = '{table}'
+        WHERE schemaname = :schema AND relname = :table
         """
         
         # Index information
-        index_query = f"""
+        index_query = """
         SELECT 
-            indexname,
-            indexdef,
-            pg_size_pretty(pg_relation_size(indexrelid)) as index_size
-        FROM pg_indexes
-        JOIN pg_stat_user_indexes USING (schemaname, tablename, indexname)
-        WHERE schemaname = '{schema}' AND tablename = '{table}'
+            i.indexname,
+            i.indexdef,
+            pg_size_pretty(pg_relation_size(s.indexrelid)) as index_size
+        FROM pg_indexes i
+        JOIN pg_stat_user_indexes s
+          ON s.schemaname = i.schemaname AND s.relname = i.tablename AND s.indexrelname = i.indexname
+        WHERE i.schemaname = :schema AND i.tablename = :table
         """
         
-        size_result = await self.analyze_query(size_query, explain=False)
-        index_result = await self.analyze_query(index_query, explain=False)
+        params = {"schema": schema, "table": table}
+        size_result = await self.analyze_query(size_query, explain=False, params=params)
+        index_result = await self.analyze_query(index_query, explain=False, params=params)
         
         # Display table statistics
         if size_result["results"]:
@@ -245,6 +475,201 @@ class DatabaseDebugger:
             console.print(index_table)
 
 
+    async def table_health(self) -> Dict[str, Any]:
+        """Bloat and autovacuum health of every user table and partition in one pass"""
+        from sqlalchemy import text
+
+        with self.Session() as session:
+            tables = [dict(r) for r in session.execute(text(HEALTH_TABLES_QUERY)).mappings()]
+            indexes = [dict(r) for r in session.execute(text(HEALTH_INDEXES_QUERY)).mappings()]
+            settings = {r[0]: r[1] for r in session.execute(text(HEALTH_SETTINGS_QUERY))}
+            running = [dict(r) for r in session.execute(text(HEALTH_WORKERS_QUERY)).mappings()]
+
+        block_size = int(settings.get("block_size", 8192))
+        freeze_max_age = int(settings.get("autovacuum_freeze_max_age", 200000000))
+        max_workers = int(settings.get("autovacuum_max_workers", 3))
+
+        indexes_by_table: Dict[int, List[Dict[str, Any]]] = {}
+        for index in indexes:
+            estimate = None
+            if (index["amname"] == "btree" and not index["has_expressions"]
+                    and index["nstats"] == index["ncols"] and index["relpages"] > 1):
+                fillfactor = int(parse_reloptions(index["reloptions"]).get("fillfactor", 90))
+                expected = estimate_btree_pages(index["reltuples"], float(index["datawidth"]), fillfactor, block_size)
+                estimate = max(0, index["relpages"] - expected) * block_size
+            indexes_by_table.setdefault(index["relid"], []).append({
+                "index": index["index_name"],
+                "method": index["amname"],
+                "bytes": index["index_bytes"],
+                "bloat_bytes": estimate,
+                "bloat_ratio": round(estimate / index["index_bytes"], 4) if estimate and index["index_bytes"] else None,
+                "scans": index["idx_scan"],
+            })
+
+        results = []
+        for table in tables:
+            options = parse_reloptions(table["reloptions"])
+            effective = {
+                name: options.get(name, settings.get(name.replace("autovacuum_enabled", "autovacuum")))
+                for name in AUTOVACUUM_RELOPTIONS
+            }
+            if effective["autovacuum_vacuum_cost_limit"] in (None, "-1"):
+                effective["autovacuum_vacuum_cost_limit"] = settings.get("vacuum_cost_limit")
+
+            rows = table["reltuples"] if table["reltuples"] >= 0 else table["n_live_tup"]
+            vacuum_trigger = (float(effective["autovacuum_vacuum_threshold"])
+                              + float(effective["autovacuum_vacuum_scale_factor"]) * rows)
+            analyze_trigger = (float(effective["autovacuum_analyze_threshold"])
+                               + float(effective["autovacuum_analyze_scale_factor"]) * rows)
+            dead, live = table["n_dead_tup"], table["n_live_tup"]
+
+            heap_bloat = None
+            if table["datawidth"] is not None and table["relpages"] > 0:
+                fillfactor = int(options.get("fillfactor", 100))
+                expected = estimate_heap_pages(rows, float(table["datawidth"]), table["ncols"], fillfactor, block_size)
+                heap_bloat = max(0, table["relpages"] - expected) * block_size
+
+            table_indexes = indexes_by_table.get(table["relid"], [])
+            name = f"{table['schemaname']}.{table['relname']}"
+            flags = []
+            if str(effective["autovacuum_enabled"]).lower() in ("off", "false"):
+                flags.append("autovacuum_disabled")
+            if dead > 2 * vacuum_trigger:
+                flags.append("autovacuum_lagging")
+            if dead > 10000 and dead / max(live + dead, 1) > 0.2:
+                flags.append("dead_tuples")
+            if table["n_mod_since_analyze"] > 2 * analyze_trigger:
+                flags.append("analyze_lagging")
+            if heap_bloat and heap_bloat >= BLOAT_MIN_BYTES and heap_bloat / table["table_bytes"] >= 0.3:
+                flags.append("heap_bloat")
+            bloated_indexes = [
+                i["index"] for i in table_indexes
+                if i["bloat_bytes"] and i["bloat_bytes"] >= BLOAT_MIN_BYTES and i["bloat_ratio"] >= 0.5
+            ]
+            if bloated_indexes:
+                flags.append("index_bloat")
+            if table["xid_age"] > 0.75 * freeze_max_age:
+                flags.append("wraparound_risk")
+
+            # Autovacuum settings live on the leaf partition, never on the partitioned parent
+            recommended: Dict[str, Any] = {}
+            if "autovacuum_lagging" in flags or "dead_tuples" in flags:
+                scale = 0.01 if rows > 1000000 else 0.05
+                if float(effective["autovacuum_vacuum_scale_factor"]) > scale:
+                    recommended["autovacuum_vacuum_scale_factor"] = scale
+                    recommended["autovacuum_vacuum_threshold"] = 1000
+                if table["autovacuum_count"] and "autovacuum_lagging" in flags:
+                    # Autovacuum does run but cannot finish between triggers
+                    cost_limit = int(effective["autovacuum_vacuum_cost_limit"] or 200)
+                    recommended["autovacuum_vacuum_cost_limit"] = min(cost_limit * 4, 10000)
+            if "analyze_lagging" in flags and float(effective["autovacuum_analyze_scale_factor"]) > 0.02:
+                recommended["autovacuum_analyze_scale_factor"] = 0.02
+
+            actions = []
+            if recommended:
+                actions.append(f"ALTER TABLE {name} SET ("
+                               + ", ".join(f"{k} = {v}" for k, v in recommended.items()) + ");")
+            if "heap_bloat" in flags:
+                actions.append(f"-- rewrite {name} with pg_repack (VACUUM FULL takes an exclusive lock)")
+            for index in bloated_indexes:
+                actions.append(f"REINDEX INDEX CONCURRENTLY {table['schemaname']}.{index};")
+            if "wraparound_risk" in flags:
+                actions.append(f"VACUUM (FREEZE, VERBOSE) {name};")
+
+            results.append({
+                "table": name,
+                "parent": f"{table['schemaname']}.{table['parent']}" if table["parent"] else None,
+                "live_tuples": live,
+                "dead_tuples": dead,
+                "dead_ratio": round(dead / max(live + dead, 1), 4),
+                "modified_since_analyze": table["n_mod_since_analyze"],
+                "hot_update_ratio": round(table["n_tup_hot_upd"] / table["n_tup_upd"], 4) if table["n_tup_upd"] else None,
+                "vacuum_trigger": int(vacuum_trigger),
+                "analyze_trigger": int(analyze_trigger),
+                "table_bytes": table["table_bytes"],
+                "index_bytes": table["index_bytes"],
+                "heap_bloat_bytes": heap_bloat,
+                "heap_bloat_ratio": round(heap_bloat / table["table_bytes"], 4) if heap_bloat and table["table_bytes"] else None,
+                "indexes": table_indexes,
+                "xid_age": table["xid_age"],
+                "last_vacuum": table["last_vacuum"],
+                "last_autovacuum": table["last_autovacuum"],
+                "last_analyze": table["last_analyze"],
+                "last_autoanalyze": table["last_autoanalyze"],
+                "autovacuum_count": table["autovacuum_count"],
+                "autovacuum_settings": effective,
+                "table_overrides": {k: v for k, v in options.items() if k in AUTOVACUUM_RELOPTIONS},
+                "flags": flags,
+                "recommended_settings": recommended,
+                "actions": actions,
+            })
+
+        results.sort(key=lambda r: (-len(r["flags"]), -r["dead_tuples"]))
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "autovacuum": {
+                "enabled": settings.get("autovacuum"),
+                "max_workers": max_workers,
+                "running": running,
+                "workers_saturated": len(running) >= max_workers,
+                "naptime": settings.get("autovacuum_naptime"),
+                "freeze_max_age": freeze_max_age,
+            },
+            "tables_scanned": len(results),
+            "tables_flagged": sum(1 for r in results if r["flags"]),
+            "tables": results,
+        }
+
+    def display_health(self, report: Dict[str, Any], limit: int = 30):
+        """Display the most unhealthy tables and the settings to change"""
+        def size(value: Optional[int]) -> str:
+            if value is None:
+                return "-"
+            for unit in ("B", "kB", "MB", "GB"):
+                if value < 1024:
+                    return f"{value:.0f} {unit}"
+                value /= 1024
+            return f"{value:.1f} TB"
+
+        table = Table(title=f"Table Health ({report['tables_flagged']}/{report['tables_scanned']} flagged)")
+        table.add_column("Table", style="cyan")
+        table.add_column("Live", justify="right")
+        table.add_column("Dead", justify="right")
+        table.add_column("Dead %", justify="right")
+        table.add_column("Heap Bloat", justify="right")
+        table.add_column("Index Bloat", justify="right")
+        table.add_column("Last Autovacuum")
+        table.add_column("Flags", style="red")
+
+        for entry in report["tables"][:limit]:
+            index_bloat = sum(i["bloat_bytes"] or 0 for i in entry["indexes"])
+            table.add_row(
+                entry["table"],
+                str(entry["live_tuples"]),
+                str(entry["dead_tuples"]),
+                f"{entry['dead_ratio']:.1%}",
+                size(entry["heap_bloat_bytes"]),
+                size(index_bloat) if entry["indexes"] else "-",
+                str(entry["last_autovacuum"] or "never")[:19],
+                ", ".join(entry["flags"]),
+            )
+        console.print(table)
+
+        autovacuum = report["autovacuum"]
+        style = "red" if autovacuum["workers_saturated"] else "green"
+        console.print(Panel(
+            f"[cyan]Autovacuum:[/cyan] {autovacuum['enabled']}\n"
+            f"[cyan]Workers busy:[/cyan] {len(autovacuum['running'])}/{autovacuum['max_workers']}\n"
+            f"[cyan]Naptime:[/cyan] {autovacuum['naptime']}s",
+            title="Autovacuum",
+            border_style=style
+        ))
+
+        actions = [a for entry in report["tables"] for a in entry["actions"]]
+        if actions:
+            console.print(Panel("\n".join(actions), title="Recommended Actions", border_style="yellow"))
+
+
 async def main():
     parser = argparse.ArgumentParser(description="YTEmpire Database Debug Utility")
     parser.add_argument("--query", "-q", help="SQL query to debug")
@@ -252,6 +677,13 @@ async def main():
     parser.add_argument("--explain", action="store_true", default=True, help="Show execution plan")
     parser.add_argument("--connections", action="store_true", help="Monitor active connections")
     parser.add_argument("--table-stats", help="Analyze table statistics (format: schema.table)")
+    parser.add_argument("--health", action="store_true",
+                        help="Bloat and autovacuum health of every table (exit code 2 when any table is flagged)")
+    parser.add_argument("--json", action="store_true", help="Print the health report as JSON on stdout")
+    parser.add_argument("--export", "-e", help="Stream the full query result to a .csv, .arrow or .parquet file")
+    parser.add_argument("--format", choices=["csv", "arrow", "parquet"],
+                        help="Export format (defaults to the --export file extension)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per record batch when exporting")
     parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
     
     args = parser.parse_args()
@@ -262,10 +694,23 @@ async def main():
         console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
         sys.exit(1)
     
-    debugger = DatabaseDebugger(database_url)
+    # Keep stdout clean for the JSON health report
+    debugger = DatabaseDebugger(database_url, echo=not (args.health and args.json))
     
     try:
-        if args.connections:
+        if args.health:
+            report = await debugger.table_health()
+            if args.json:
+                print(json.dumps(report, indent=2, default=str))
+            else:
+                debugger.display_health(report)
+                output_file = f"table_health_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                with open(output_file, 'w') as f:
+                    json.dump(report, f, indent=2, default=str)
+                console.print(f"\n[green]Results saved to {output_file}[/green]")
+            if report["tables_flagged"]:
+                sys.exit(2)
+        elif args.connections:
             await debugger.monitor_connections()
         elif args.table_stats:
             parts = args.table_stats.split(".")
@@ -281,6 +726,25 @@ async def main():
             else:
                 query = args.query
             
+            if args.export:
+                fmt = args.format or EXPORT_FORMATS.get(os.path.splitext(args.export)[1].lower())
+                if not fmt:
+                    console.print("[red]Error: Cannot infer export format; use --format[/red]")
+                    sys.exit(1)
+                
+                export = await debugger.export_query(query, args.export, fmt, args.batch_size)
+                rate = f"{export['rows_per_second']:,.0f} rows/s" if export["rows_per_second"] else "n/a"
+                console.print(Panel(
+                    f"[cyan]File:[/cyan] {export['output_file']}\n"
+                    f"[cyan]Format:[/cyan] {export['format']}\n"
+                    f"[cyan]Rows:[/cyan] {export['rows'] if export['rows'] is not None else 'unknown'}\n"
+                    f"[cyan]Size:[/cyan] {export['bytes']:,} bytes\n"
+                    f"[cyan]Time:[/cyan] {export['seconds']:.2f}s ({rate})",
+                    title="Export Complete",
+                    border_style="green"
+                ))
+                return
+            
             # Analyze and display
             result = await debugger.analyze_query(query, args.explain)
             debugger.display_results(result)
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Database Load Test Utility
+Sweep client concurrency and pool size over a weighted dashboard query mix
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+import os
+from dotenv import load_dotenv
+
+from db_router import ReplicaRouter, replica_urls_from_env
+from metrics import observe_pool_wait, observe_query, percentile, start_metrics_server
+
+load_dotenv()
+
+console = Console()
+
+# A failing client backs off from ERROR_BACKOFF seconds, doubling per consecutive
+# error, and gives up after MAX_CONSECUTIVE_ERRORS rather than spinning the loop
+ERROR_BACKOFF = 0.01
+MAX_CONSECUTIVE_ERRORS = 10
+
+# Weighted mix of the queries behind the dashboard endpoints.
+# "params" names the sampled id list the query is parameterised with;
+# "max_lag" is the replica replay lag in seconds each read tolerates.
+DASHBOARD_QUERIES = {
+    "channel_overview": {
+        "weight": 30,
+        "params": None,
+        "max_lag": 300,
+        "sql": """
+            SELECT channel_id, channel_name, subscriber_count, views_last_30_days,
+                   revenue_last_30_days, engagement_rate_30d
+            FROM analytics.channel_overview
+            ORDER BY views_last_30_days DESC
+            LIMIT 20
+        """,
+    },
+    "channel_daily_metrics": {
+        "weight": 25,
+        "params": "channel",
+        "max_lag": 60,
+        "sql": """
+            SELECT date, views, watch_time_minutes, estimated_revenue, subscribers_gained
+            FROM analytics.channel_analytics
+            WHERE channel_id = $1 AND date >= CURRENT_DATE - 30
+            ORDER BY date
+        """,
+    },
+    "channel_top_videos": {
+        "weight": 20,
+        "params": "channel",
+        "max_lag": 30,
+        "sql": """
+            SELECT video_id, title, view_count, like_count, comment_count
+            FROM content.videos
+            WHERE channel_id = $1 AND privacy_status = 'public'
+            ORDER BY view_count DESC
+            LIMIT 20
+        """,
+    },
+    "recent_public_videos": {
+        "weight": 15,
+        "params": None,
+        "max_lag": 5,
+        "sql": """
+            SELECT v.video_id, v.title, v.view_count, v.published_at, c.channel_name
+            FROM content.videos v
+            JOIN content.channels c ON c.channel_id = v.channel_id
+            WHERE v.privacy_status = 'public'
+            ORDER BY v.published_at DESC
+            LIMIT 20
+        """,
+    },
+    "video_daily_metrics": {
+        "weight": 10,
+        "params": "video",
+        "max_lag": 60,
+        "sql": """
+            SELECT date, views, watch_time_minutes, average_view_duration_seconds, likes, comments
+            FROM analytics.video_analytics
+            WHERE video_id = $1 AND date >= CURRENT_DATE - 30
+            ORDER BY date
+        """,
+    },
+}
+
+SAMPLE_ID_QUERIES = {
+    "channel": "SELECT channel_id FROM content.channels WHERE status = 'active' ORDER BY random() LIMIT $1",
+    "video": "SELECT video_id FROM content.videos WHERE privacy_status = 'public' ORDER BY random() LIMIT $1",
+}
+
+WAIT_EVENT_QUERY = """
+    SELECT wait_event_type || ':' || wait_event AS wait_event, COUNT(*) AS sessions
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND state = 'active'
+      AND wait_event IS NOT NULL
+      AND pid <> pg_backend_pid()
+    GROUP BY 1
+"""
+
+
+class DatabaseLoadTester:
+    def __init__(self, database_url: str, statement_cache: bool = True,
+                 replica_urls: Optional[List[str]] = None):
+        self.database_url = database_url
+        # With replicas, reads go through a ReplicaRouter with one pool per node
+        self.replica_urls = replica_urls or []
+        # PgBouncer in transaction mode cannot keep prepared statements per client
+        self.statement_cache_size = 100 if statement_cache else 0
+        self.sample_ids: Dict[str, List[Any]] = {}
+        self.queries: Dict[str, Dict[str, Any]] = {}
+
+    async def prepare(self, sample_size: int = 200) -> Dict[str, Any]:
+        """Sample ids for parameterised queries and read server limits"""
+        conn = await asyncpg.connect(self.database_url, statement_cache_size=self.statement_cache_size)
+        try:
+            for name, query in SAMPLE_ID_QUERIES.items():
+                self.sample_ids[name] = [r[0] for r in await conn.fetch(query, sample_size)]
+            max_connections = int(await conn.fetchval("SHOW max_connections"))
+            reserved = int(await conn.fetchval("SHOW superuser_reserved_connections"))
+        finally:
+            await conn.close()
+
+        # Drop queries that have nothing to be parameterised with
+        self.queries = {
+            name: query for name, query in DASHBOARD_QUERIES.items()
+            if query["params"] is None or self.sample_ids.get(query["params"])
+        }
+        return {"max_connections": max_connections, "reserved_connections": reserved}
+
+    async def _sample_wait_events(self, stop: asyncio.Event, interval: float) -> Counter:
+        """Poll pg_stat_activity for the wait events of active sessions"""
+        samples = Counter()
+        conn = await asyncpg.connect(self.database_url, statement_cache_size=self.statement_cache_size)
+        try:
+            while not stop.is_set():
+                for row in await conn.fetch(WAIT_EVENT_QUERY):
+                    samples[row["wait_event"]] += row["sessions"]
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await conn.close()
+        return samples
+
+    async def run_step(self, concurrency: int, pool_size: int, duration: float,
+                       warmup: float = 1.0, sample_interval: float = 0.25) -> Dict[str, Any]:
+        """Run the query mix with `concurrency` clients sharing a pool of `pool_size`"""
+        router = None
+        if self.replica_urls:
+            router = ReplicaRouter(
+                self.database_url, self.replica_urls, pool_size=pool_size, min_pool_size=pool_size,
+                statement_cache=self.statement_cache_size > 0,
+            )
+            await router.start()
+            pool = None
+        else:
+            pool = await asyncpg.create_pool(
+                self.database_url,
+                min_size=pool_size,
+                max_size=pool_size,
+                statement_cache_size=self.statement_cache_size,
+            )
+        names = list(self.queries)
+        weights = [self.queries[n]["weight"] for n in names]
+        latencies: List[float] = []
+        pool_waits: List[float] = []
+        per_query = Counter()
+        errors = Counter()
+        stopped_clients: List[int] = []
+
+        measure_start = time.perf_counter() + warmup
+        measure_end = measure_start + duration
+
+        async def client(seed: int):
+            rng = random.Random(seed)
+            failures = 0
+            while True:
+                name = rng.choices(names, weights)[0]
+                query = self.queries[name]
+                args = [rng.choice(self.sample_ids[query["params"]])] if query["params"] else []
+
+                started = time.perf_counter()
+                if started >= measure_end:
+                    return
+                try:
+                    acquire = router.acquire(max_lag=query["max_lag"]) if router else pool.acquire()
+                    async with acquire as conn:
+                        acquired = time.perf_counter()
+                        if not router:
+                            observe_pool_wait("primary", acquired - started)
+                        await conn.fetch(query["sql"], *args)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                    failures += 1
+                    if failures >= MAX_CONSECUTIVE_ERRORS:
+                        stopped_clients.append(seed)
+                        return
+                    await asyncio.sleep(ERROR_BACKOFF * 2 ** (failures - 1))
+                    continue
+                failures = 0
+                finished = time.perf_counter()
+                observe_query(query["sql"], finished - acquired)
+
+                if started >= measure_start:
+                    pool_waits.append(acquired - started)
+                    latencies.append(finished - started)
+                    per_query[name] += 1
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(self._sample_wait_events(stop, sample_interval))
+        try:
+            await asyncio.gather(*[client(i) for i in range(concurrency)])
+        finally:
+            stop.set()
+            wait_events = await sampler
+            if router:
+                await router.close()
+            else:
+                await pool.close()
+
+        def to_ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "concurrency": concurrency,
+            "pool_size": pool_size,
+            "queries": len(latencies),
+            "throughput_qps": round(len(latencies) / duration, 1),
+            "latency_ms": {
+                "p50": to_ms(percentile(latencies, 50)),
+                "p95": to_ms(percentile(latencies, 95)),
+                "p99": to_ms(percentile(latencies, 99)),
+                "max": to_ms(max(latencies) if latencies else None),
+            },
+            "pool_wait_ms": {
+                "mean": to_ms(statistics.mean(pool_waits) if pool_waits else None),
+                "p95": to_ms(percentile(pool_waits, 95)),
+            },
+            "per_query": dict(per_query),
+            "errors": dict(errors),
+            "clients_stopped": len(stopped_clients),
+            "wait_events": dict(wait_events.most_common(5)),
+            "routed": dict(router.routed) if router else None,
+            "primary_fallbacks": dict(router.fallbacks) if router else None,
+        }
+
+    async def sweep(self, concurrencies: List[int], pool_sizes: List[int],
+                    duration: float, warmup: float) -> List[Dict[str, Any]]:
+        """Run every (concurrency, pool size) combination; a pool larger than
+        its client count would only hold idle connections, so those are skipped"""
+        steps = []
+        for concurrency in concurrencies:
+            for pool_size in pool_sizes:
+                if pool_size > concurrency:
+                    continue
+                console.print(f"[cyan]→ clients={concurrency} pool={pool_size}[/cyan]")
+                step = await self.run_step(concurrency, pool_size, duration, warmup)
+                console.print(
+                    f"  {step['throughput_qps']} qps, p95 {step['latency_ms']['p95']}ms, "
+                    f"pool wait {step['pool_wait_ms']['mean']}ms"
+                )
+                if step["routed"]:
+                    console.print(f"  routed {step['routed']}")
+                if step["clients_stopped"]:
+                    console.print(f"  [yellow]{step['clients_stopped']} client(s) stopped after repeated errors: "
+                                  f"{step['errors']}[/yellow]")
+                steps.append(step)
+        return steps
+
+    @staticmethod
+    def find_knee(steps: List[Dict[str, Any]], tolerance: float = 0.05) -> Optional[Dict[str, Any]]:
+        """Smallest pool size whose best throughput is within `tolerance` of the peak
+
+        Past this point extra server connections add contention (visible as
+        LWLock/Lock wait events and rising p95) without adding throughput.
+        """
+        if not steps:
+            return None
+
+        best_by_pool: Dict[int, Dict[str, Any]] = {}
+        for step in steps:
+            best = best_by_pool.get(step["pool_size"])
+            if best is None or step["throughput_qps"] > best["throughput_qps"]:
+                best_by_pool[step["pool_size"]] = step
+
+        peak = max(s["throughput_qps"] for s in best_by_pool.values())
+        for pool_size in sorted(best_by_pool):
+            if best_by_pool[pool_size]["throughput_qps"] >= (1 - tolerance) * peak:
+                return best_by_pool[pool_size]
+        return None
+
+    def display_results(self, report: Dict[str, Any]):
+        """Display the sweep as a table and the knee as a recommendation"""
+        table = Table(title="Pool Sizing Sweep")
+        table.add_column("Clients", style="cyan", justify="right")
+        table.add_column("Pool", style="cyan", justify="right")
+        table.add_column("QPS", style="green", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p95 ms", justify="right")
+        table.add_column("p99 ms", justify="right")
+        table.add_column("Pool wait ms", style="yellow", justify="right")
+        table.add_column("Top wait events", style="magenta")
+
+        knee = report["knee"]
+        for step in report["steps"]:
+            is_knee = knee is not None and step is knee
+            table.add_row(
+                str(step["concurrency"]),
+                f"[bold]{step['pool_size']}[/bold]" if is_knee else str(step["pool_size"]),
+                str(step["throughput_qps"]),
+                str(step["latency_ms"]["p50"]),
+                str(step["latency_ms"]["p95"]),
+                str(step["latency_ms"]["p99"]),
+                str(step["pool_wait_ms"]["mean"]),
+                ", ".join(f"{k}={v}" for k, v in list(step["wait_events"].items())[:3]) or "-",
+            )
+        console.print(table)
+
+        if knee:
+            console.print(Panel(
+                f"[cyan]Recommended pool size:[/cyan] {knee['pool_size']}\n"
+                f"[cyan]Throughput:[/cyan] {knee['throughput_qps']} qps at {knee['concurrency']} clients\n"
+                f"[cyan]p95 latency:[/cyan] {knee['latency_ms']['p95']}ms\n"
+                f"[cyan]Server max_connections:[/cyan] {report['server']['max_connections']} "
+                f"({report['server']['reserved_connections']} reserved)",
+                title="Knee of the Throughput Curve",
+                border_style="green"
+            ))
+
+
+def parse_int_list(value: str) -> List[int]:
+    return sorted({int(v) for v in value.split(",") if v.strip()})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Database Load Test Utility")
+    parser.add_argument("--concurrency", "-c", type=parse_int_list, default="8,16,32,64,128",
+                        help="Comma-separated client concurrency levels")
+    parser.add_argument("--pool-sizes", "-p", type=parse_int_list, default="4,8,16,24,32,48,64",
+                        help="Comma-separated pool sizes")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="Measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per step")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Throughput tolerance for the knee")
+    parser.add_argument("--no-statement-cache", action="store_true",
+                        help="Disable prepared statements (required behind PgBouncer transaction pooling)")
+    parser.add_argument("--replica-url", action="append", default=None,
+                        help="Route reads to this replica within each query's lag bound "
+                             "(repeatable; defaults to DATABASE_REPLICA_URLS)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port during the sweep")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    tester = DatabaseLoadTester(database_url, statement_cache=not args.no_statement_cache,
+                                replica_urls=args.replica_url or replica_urls_from_env())
+
+    try:
+        if args.metrics_port:
+            await start_metrics_server(args.metrics_port)
+            console.print(f"[green]Metrics on http://127.0.0.1:{args.metrics_port}/metrics[/green]")
+
+        server = await tester.prepare()
+        available = server["max_connections"] - server["reserved_connections"]
+        if max(args.pool_sizes) > available:
+            console.print(f"[yellow]Warning: pool sizes above {available} will exhaust max_connections[/yellow]")
+        console.print(f"[green]Query mix: {', '.join(tester.queries)}[/green]")
+
+        steps = await tester.sweep(args.concurrency, args.pool_sizes, args.duration, args.warmup)
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "server": server,
+            "duration_seconds": args.duration,
+            "query_mix": {name: q["weight"] for name, q in tester.queries.items()},
+            "steps": steps,
+            "knee": tester.find_knee(steps, args.tolerance),
+        }
+        tester.display_results(report)
+
+        # Save results to file
+        output_file = f"loadtest_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        console.print(f"\n[green]Results saved to {output_file}[/green]")
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
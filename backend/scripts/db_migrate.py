@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Database Migration Runner
+Online, batched and resumable backfill for database/migrations/migrate-to-new-schema.sql
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+console = Console()
+
+MIGRATION_NAME = "migrate-to-new-schema"
+MIGRATION_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "ytempire:migrations")
+
+# Backfill steps in dependency order. Steps sharing a level run in parallel;
+# "keys" is the keyset the source is paginated by and "partition_by" splits a
+# step into one independently checkpointed unit per month.
+MIGRATION_STEPS = [
+    {
+        "target": "users.accounts",
+        "source": "ytempire.users",
+        "keys": ["id"],
+        "level": 0,
+        "insert": """
+            INSERT INTO users.accounts (
+                account_id, email, username, password_hash, account_type,
+                account_status, email_verified, created_at, updated_at
+            )
+            SELECT
+                id, email, username, password_hash,
+                CASE
+                    WHEN role = 'admin' THEN 'admin'
+                    WHEN role = 'user' THEN 'creator'
+                    ELSE 'creator'
+                END,
+                CASE WHEN is_active THEN 'active' ELSE 'suspended' END,
+                email_verified, created_at, updated_at
+            FROM batch
+            ON CONFLICT (email) DO NOTHING
+        """,
+    },
+    {
+        "target": "users.profiles",
+        "source": "ytempire.users",
+        "keys": ["id"],
+        "level": 1,
+        "insert": """
+            INSERT INTO users.profiles (
+                account_id, first_name, last_name, avatar_url, created_at, updated_at
+            )
+            SELECT id, first_name, last_name, avatar_url, created_at, updated_at
+            FROM batch
+            WHERE id IN (SELECT account_id FROM users.accounts)
+            ON CONFLICT DO NOTHING
+        """,
+    },
+    {
+        "target": "content.channels",
+        "source": "ytempire.channels",
+        "keys": ["id"],
+        "level": 1,
+        "insert": """
+            INSERT INTO content.channels (
+                channel_id, account_id, youtube_channel_id, channel_name, description,
+                thumbnail_url, status, created_at, updated_at
+            )
+            SELECT
+                id, user_id, youtube_channel_id, name, description, thumbnail_url,
+                CASE WHEN is_active THEN 'active' ELSE 'inactive' END,
+                created_at, updated_at
+            FROM batch
+            WHERE user_id IN (SELECT account_id FROM users.accounts)
+            ON CONFLICT (youtube_channel_id) DO NOTHING
+        """,
+    },
+    {
+        "target": "content.videos",
+        "source": "ytempire.videos",
+        "keys": ["id"],
+        "level": 2,
+        "insert": """
+            INSERT INTO content.videos (
+                video_id, channel_id, youtube_video_id, title, description, tags,
+                thumbnail_url, duration_seconds, published_at, privacy_status,
+                upload_status, created_at, updated_at
+            )
+            SELECT
+                id, channel_id, youtube_video_id, title, description, tags,
+                thumbnail_url, duration, published_at,
+                CASE
+                    WHEN status = 'published' THEN 'public'
+                    WHEN status = 'draft' THEN 'private'
+                    ELSE 'private'
+                END,
+                CASE WHEN status = 'published' THEN 'processed' ELSE status END,
+                created_at, updated_at
+            FROM batch
+            WHERE channel_id IN (SELECT channel_id FROM content.channels)
+            ON CONFLICT (youtube_video_id) DO NOTHING
+        """,
+    },
+    {
+        "target": "analytics.video_analytics",
+        "source": "ytempire.analytics",
+        "keys": ["date", "video_id"],
+        "partition_by": "date",
+        "level": 3,
+        "insert": """
+            INSERT INTO analytics.video_analytics (
+                video_id, date, views, watch_time_minutes, likes, comments, created_at
+            )
+            SELECT
+                video_id, date, views,
+                watch_time / 60, -- Convert seconds to minutes
+                likes, comments, created_at
+            FROM batch
+            WHERE video_id IN (SELECT video_id FROM content.videos)
+            ON CONFLICT (video_id, date) DO NOTHING
+        """,
+    },
+]
+
+COMPATIBILITY_VIEW = """
+    CREATE OR REPLACE VIEW ytempire.users_view AS
+    SELECT
+        a.account_id as id,
+        a.email,
+        a.username,
+        a.password_hash,
+        p.first_name,
+        p.last_name,
+        p.avatar_url,
+        a.email_verified,
+        a.account_status = 'active' as is_active,
+        CASE
+            WHEN a.account_type = 'admin' THEN 'admin'
+            ELSE 'user'
+        END as role,
+        a.created_at,
+        a.updated_at
+    FROM users.accounts a
+    LEFT JOIN users.profiles p ON a.account_id = p.account_id
+"""
+
+VERIFICATION_COUNTS = [
+    ("Users", "ytempire.users", "users.accounts"),
+    ("Channels", "ytempire.channels", "content.channels"),
+    ("Videos", "ytempire.videos", "content.videos"),
+]
+
+# Secondary indexes are dropped for the backfill and rebuilt afterwards.
+# Primary keys and unique indexes stay: ON CONFLICT relies on them.
+SECONDARY_INDEX_QUERY = """
+    SELECT i.indexrelid::regclass::text AS name,
+           pg_get_indexdef(i.indexrelid) AS definition,
+           c.relkind = 'p' AS partitioned
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    WHERE i.indrelid = ANY($1::text[]::regclass[])
+      AND NOT i.indisunique
+      AND NOT i.indisprimary
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = i.indexrelid)
+    ORDER BY 1
+"""
+
+
+def unit_id(*parts: str) -> uuid.UUID:
+    """Stable sync_logs entity id for a unit of migration work"""
+    return uuid.uuid5(MIGRATION_NAMESPACE, ":".join([MIGRATION_NAME, *parts]))
+
+
+def unit_scope(month: Optional[date]) -> str:
+    """Scope of a backfill unit: its month, or 'all' for unpartitioned steps"""
+    return month.strftime("%Y-%m") if month else "all"
+
+
+def next_month(day: date) -> date:
+    """First day of the month after `day`"""
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def month_starts(first: date, last: date) -> List[date]:
+    """First day of every month from first to last inclusive"""
+    months = []
+    current = first.replace(day=1)
+    while current <= last:
+        months.append(current)
+        current = next_month(current)
+    return months
+
+
+class MigrationRunner:
+    def __init__(self, database_url: str, batch_size: int = 5000, workers: int = 4,
+                 throttle_ms: int = 0, rebuild_indexes: bool = True):
+        self.database_url = database_url
+        self.batch_size = batch_size
+        self.workers = workers
+        self.throttle = throttle_ms / 1000
+        self.rebuild_indexes = rebuild_indexes
+        self.pool: Optional[asyncpg.Pool] = None
+        self.results: List[Dict[str, Any]] = []
+
+    async def connect(self):
+        """Create the connection pool (one connection per worker plus one spare)"""
+        self.pool = await asyncpg.create_pool(self.database_url, min_size=1, max_size=self.workers + 1)
+
+    async def disconnect(self):
+        if self.pool:
+            await self.pool.close()
+
+    async def _load_checkpoint(self, entity_id: uuid.UUID) -> Optional[asyncpg.Record]:
+        return await self.pool.fetchrow("""
+            SELECT sync_status, records_processed, records_created, checkpoint
+            FROM system.sync_logs
+            WHERE entity_type = 'migration' AND entity_id = $1
+        """, entity_id)
+
+    async def _start_checkpoint(self, entity_id: uuid.UUID, checkpoint: Dict[str, Any],
+                                overwrite: bool = False):
+        """Create the unit's sync_logs row, or flip an existing one back to running
+
+        An existing checkpoint is kept (that is what a resume continues from)
+        unless `overwrite` is set.
+        """
+        async with self.pool.acquire() as conn:
+            updated = await conn.execute("""
+                UPDATE system.sync_logs
+                SET sync_status = 'running', error_message = NULL, started_at = NOW(),
+                    checkpoint = CASE WHEN $3 THEN $2::jsonb ELSE checkpoint END
+                WHERE entity_type = 'migration' AND entity_id = $1
+            """, entity_id, json.dumps(checkpoint), overwrite)
+            if updated == "UPDATE 0":
+                await conn.execute("""
+                    INSERT INTO system.sync_logs (entity_type, entity_id, sync_type, sync_status, checkpoint)
+                    VALUES ('migration', $1, 'incremental', 'running', $2::jsonb)
+                """, entity_id, json.dumps(checkpoint))
+
+    async def _finish_checkpoint(self, entity_id: uuid.UUID, status: str, error: Optional[str] = None):
+        """Record the unit's outcome and how long this run of it took"""
+        await self.pool.execute("""
+            UPDATE system.sync_logs
+            SET sync_status = $2, error_message = $3, completed_at = NOW(),
+                execution_time_ms = (EXTRACT(EPOCH FROM NOW() - started_at) * 1000)::integer
+            WHERE entity_type = 'migration' AND entity_id = $1
+        """, entity_id, status, error)
+
+    async def reset(self):
+        """Forget backfill checkpoints so the next run starts from the beginning
+
+        The index checkpoint is kept: it may hold the only copy of definitions
+        for indexes an interrupted run already dropped.
+        """
+        await self.pool.execute("""
+            DELETE FROM system.sync_logs
+            WHERE entity_type = 'migration' AND entity_id <> $1
+        """, unit_id("indexes"))
+
+    async def prepare(self):
+        """Check the target schema exists and create analytics partitions"""
+        async with self.pool.acquire() as conn:
+            missing = [
+                step["target"] for step in MIGRATION_STEPS
+                if await conn.fetchval("SELECT to_regclass($1)", step["target"]) is None
+            ]
+            if missing:
+                raise RuntimeError(
+                    f"Target tables missing: {', '.join(missing)}. Run database/schema/*.sql first."
+                )
+
+            await conn.execute("ALTER TABLE system.sync_logs ADD COLUMN IF NOT EXISTS checkpoint JSONB")
+
+            bounds = await conn.fetchrow("SELECT MIN(date) AS first, MAX(date) AS last FROM ytempire.analytics")
+            if bounds["first"] is not None:
+                for month in month_starts(bounds["first"], bounds["last"]):
+                    await conn.execute("SELECT create_monthly_partition('video_analytics', $1)", month)
+
+    async def _key_types(self, source: str) -> Dict[str, str]:
+        rows = await self.pool.fetch("""
+            SELECT attname, format_type(atttypid, atttypmod) AS type
+            FROM pg_attribute
+            WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+        """, source)
+        return {r["attname"]: r["type"] for r in rows}
+
+    def _chunk_sql(self, step: Dict[str, Any], key_types: Dict[str, str],
+                   scoped: bool, has_cursor: bool) -> str:
+        """Build the keyset-paginated INSERT ... SELECT for one chunk
+
+        $1 is the batch size, then the month bounds when scoped, then one
+        parameter per key column holding the last key of the previous chunk.
+        Keys travel as text so checkpoints can be stored as JSON.
+        """
+        keys = step["keys"]
+        conditions = []
+        param = 2
+        if scoped:
+            column = step["partition_by"]
+            conditions.append(f"{column} >= ${param}::date AND {column} < ${param + 1}::date")
+            param += 2
+        if has_cursor:
+            placeholders = [f"${param + i}::text::{key_types[k]}" for i, k in enumerate(keys)]
+            conditions.append(f"({', '.join(keys)}) > ({', '.join(placeholders)})")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = ", ".join(keys)
+        last_key = ", ".join(f"{k}::text" for k in keys)
+        order_desc = ", ".join(f"{k} DESC" for k in keys)
+
+        return f"""
+            WITH batch AS (
+                SELECT * FROM {step['source']} {where} ORDER BY {order} LIMIT $1
+            ), inserted AS (
+                {step['insert']}
+                RETURNING 1
+            )
+            SELECT
+                (SELECT ARRAY[{last_key}] FROM batch ORDER BY {order_desc} LIMIT 1) AS last_key,
+                (SELECT COUNT(*) FROM batch) AS scanned,
+                (SELECT COUNT(*) FROM inserted) AS created
+        """
+
+    async def backfill_unit(self, step: Dict[str, Any], key_types: Dict[str, str],
+                            month: Optional[date] = None) -> Dict[str, Any]:
+        """Copy one table (or one month of it) chunk by chunk, resuming from its checkpoint"""
+        scope = unit_scope(month)
+        entity_id = unit_id(step["target"], scope)
+        name = f"{step['target']}[{scope}]" if month else step["target"]
+
+        existing = await self._load_checkpoint(entity_id)
+        if existing and existing["sync_status"] == "completed":
+            console.print(f"  [dim]{name}: already completed, skipping[/dim]")
+            return {"unit": name, "scanned": existing["records_processed"],
+                    "created": existing["records_created"], "seconds": 0.0, "skipped": True}
+
+        checkpoint = json.loads(existing["checkpoint"]) if existing and existing["checkpoint"] else {}
+        last_key = checkpoint.get("last_key")
+        scanned = existing["records_processed"] if existing else 0
+        created = existing["records_created"] if existing else 0
+        if last_key:
+            console.print(f"  [yellow]{name}: resuming after {last_key} ({scanned} rows done)[/yellow]")
+
+        await self._start_checkpoint(entity_id, {"target": step["target"], "scope": scope, "last_key": None})
+
+        scope_args = [month, next_month(month)] if month else []
+
+        started = time.perf_counter()
+        run_scanned = 0
+        try:
+            while True:
+                sql = self._chunk_sql(step, key_types, scoped=bool(month), has_cursor=last_key is not None)
+                args = [self.batch_size, *scope_args, *(last_key or [])]
+
+                # The chunk and its checkpoint commit together, so a crash
+                # never loses or repeats a chunk
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        row = await conn.fetchrow(sql, *args)
+                        if row["scanned"] == 0:
+                            break
+                        last_key = list(row["last_key"])
+                        scanned += row["scanned"]
+                        created += row["created"]
+                        run_scanned += row["scanned"]
+                        await conn.execute("""
+                            UPDATE system.sync_logs
+                            SET records_processed = $2, records_created = $3,
+                                checkpoint = jsonb_set(checkpoint, '{last_key}', $4::jsonb)
+                            WHERE entity_type = 'migration' AND entity_id = $1
+                        """, entity_id, scanned, created, json.dumps(last_key))
+
+                if row["scanned"] < self.batch_size:
+                    break
+                if self.throttle:
+                    await asyncio.sleep(self.throttle)
+
+        except Exception as e:
+            await self._finish_checkpoint(entity_id, "failed", str(e))
+            raise
+
+        await self._finish_checkpoint(entity_id, "completed")
+        seconds = time.perf_counter() - started
+        rate = run_scanned / seconds if seconds > 0 else 0
+        console.print(f"  [green]{name}: {scanned} rows scanned, {created} created ({rate:,.0f} rows/s)[/green]")
+        return {"unit": name, "scanned": scanned, "created": created, "seconds": seconds,
+                "rows_per_second": rate, "skipped": False}
+
+    async def _work_units(self, step: Dict[str, Any]) -> List[Optional[date]]:
+        if not step.get("partition_by"):
+            return [None]
+        bounds = await self.pool.fetchrow(
+            f"SELECT MIN({step['partition_by']}) AS first, MAX({step['partition_by']}) AS last FROM {step['source']}"
+        )
+        if bounds["first"] is None:
+            return []
+        return month_starts(bounds["first"], bounds["last"])
+
+    async def backfill(self):
+        """Run every level in order; units within a level run in parallel"""
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def run(step, key_types, month):
+            async with semaphore:
+                return await self.backfill_unit(step, key_types, month)
+
+        for level in sorted({s["level"] for s in MIGRATION_STEPS}):
+            tasks = []
+            for step in [s for s in MIGRATION_STEPS if s["level"] == level]:
+                key_types = await self._key_types(step["source"])
+                for month in await self._work_units(step):
+                    tasks.append(run(step, key_types, month))
+
+            console.print(f"[cyan]→ Level {level}: {len(tasks)} unit(s)[/cyan]")
+            self.results.extend(await asyncio.gather(*tasks))
+
+    async def backfill_pending(self) -> bool:
+        """Whether any backfill unit has not completed yet"""
+        ids = [
+            unit_id(step["target"], unit_scope(month))
+            for step in MIGRATION_STEPS
+            for month in await self._work_units(step)
+        ]
+        completed = await self.pool.fetchval("""
+            SELECT COUNT(*) FROM system.sync_logs
+            WHERE entity_type = 'migration' AND entity_id = ANY($1::uuid[]) AND sync_status = 'completed'
+        """, ids)
+        return completed < len(ids)
+
+    async def drop_secondary_indexes(self) -> List[Dict[str, Any]]:
+        """Drop secondary indexes on the targets, remembering their definitions
+
+        The definitions are stored in the checkpoint before anything is
+        dropped, so a resumed run rebuilds them even if this run dies. A
+        pending checkpoint is always returned for rebuilding, even when
+        indexes are kept; keeping them only stops new drops.
+        """
+        entity_id = unit_id("indexes")
+        existing = await self._load_checkpoint(entity_id)
+        if existing and existing["sync_status"] != "completed":
+            return json.loads(existing["checkpoint"])["indexes"]
+        if not self.rebuild_indexes:
+            return []
+        if existing and not await self.backfill_pending():
+            console.print("[dim]Backfill and index rebuild already completed; keeping indexes[/dim]")
+            return []
+
+        rows = await self.pool.fetch(SECONDARY_INDEX_QUERY, [s["target"] for s in MIGRATION_STEPS])
+        indexes = [dict(r) for r in rows]
+        await self._start_checkpoint(entity_id, {"indexes": indexes}, overwrite=True)
+
+        for index in indexes:
+            concurrently = "" if index["partitioned"] else "CONCURRENTLY "
+            await self.pool.execute(f"DROP INDEX {concurrently}IF EXISTS {index['name']}")
+        console.print(f"[cyan]Dropped {len(indexes)} secondary index(es) for the backfill[/cyan]")
+        return indexes
+
+    async def rebuild_secondary_indexes(self, indexes: List[Dict[str, Any]]):
+        """Recreate the dropped indexes in parallel, concurrently where possible"""
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def rebuild(index):
+            async with semaphore, self.pool.acquire() as conn:
+                valid = await conn.fetchval(
+                    "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", index["name"]
+                )
+                if valid:
+                    return
+                if valid is False:
+                    # Left behind by an interrupted CREATE INDEX CONCURRENTLY
+                    await conn.execute(f"DROP INDEX IF EXISTS {index['name']}")
+
+                definition = index["definition"]
+                if index["partitioned"]:
+                    # pg_get_indexdef() gives "ON ONLY" for a partitioned parent, which
+                    # creates an invalid index with nothing attached; without it the
+                    # index is built on every partition and attached to the parent
+                    definition = definition.replace(" ON ONLY ", " ON ", 1)
+                else:
+                    definition = definition.replace("CREATE INDEX ", "CREATE INDEX CONCURRENTLY ", 1)
+                await conn.execute(definition)
+
+                valid = await conn.fetchval(
+                    "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", index["name"]
+                )
+                if not valid:
+                    raise RuntimeError(f"Index {index['name']} is not valid after rebuild")
+
+        entity_id = unit_id("indexes")
+        try:
+            await asyncio.gather(*[rebuild(i) for i in indexes])
+        except Exception as e:
+            await self._finish_checkpoint(entity_id, "failed", str(e))
+            raise
+        await self._finish_checkpoint(entity_id, "completed")
+
+    async def finalize(self) -> List[Dict[str, Any]]:
+        """Analyze targets, create the compatibility view and compare row counts"""
+        async with self.pool.acquire() as conn:
+            for step in MIGRATION_STEPS:
+                await conn.execute(f"ANALYZE {step['target']}")
+            await conn.execute(COMPATIBILITY_VIEW)
+
+            counts = []
+            for label, old_table, new_table in VERIFICATION_COUNTS:
+                old_count = await conn.fetchval(f"SELECT COUNT(*) FROM {old_table}")
+                new_count = await conn.fetchval(f"SELECT COUNT(*) FROM {new_table}")
+                counts.append({"entity": label, "old": old_count, "new": new_count})
+        return counts
+
+    def display_summary(self, counts: List[Dict[str, Any]], total_seconds: float):
+        """Display per-unit throughput and the verification counts"""
+        table = Table(title="Backfill Units")
+        table.add_column("Unit", style="cyan")
+        table.add_column("Scanned", justify="right")
+        table.add_column("Created", justify="right", style="green")
+        table.add_column("Seconds", justify="right")
+        table.add_column("Rows/s", justify="right", style="yellow")
+
+        for r in self.results:
+            table.add_row(
+                r["unit"], str(r["scanned"]), str(r["created"]),
+                "skipped" if r["skipped"] else f"{r['seconds']:.1f}",
+                "-" if r["skipped"] else f"{r['rows_per_second']:,.0f}"
+            )
+        console.print(table)
+
+        mismatched = [c for c in counts if c["old"] != c["new"]]
+        scanned = sum(r["scanned"] for r in self.results if not r["skipped"])
+        console.print(Panel(
+            "\n".join(f"[cyan]{c['entity']}:[/cyan] {c['old']} old -> {c['new']} new" for c in counts)
+            + f"\n[cyan]Total time:[/cyan] {total_seconds:.1f}s"
+            + f"\n[cyan]Overall rate:[/cyan] {scanned / total_seconds if total_seconds else 0:,.0f} rows/s",
+            title="Migration Summary",
+            border_style="red" if mismatched else "green"
+        ))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Database Migration Runner")
+    parser.add_argument("--batch-size", "-b", type=int, default=5000, help="Rows per chunk")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Units backfilled in parallel")
+    parser.add_argument("--throttle-ms", type=int, default=0, help="Pause between chunks of a unit")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="Keep secondary indexes during the backfill instead of rebuilding after")
+    parser.add_argument("--reset", action="store_true", help="Discard checkpoints and start over")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    runner = MigrationRunner(database_url, args.batch_size, args.workers, args.throttle_ms,
+                             rebuild_indexes=not args.keep_indexes)
+
+    try:
+        await runner.connect()
+        started = time.perf_counter()
+
+        await runner.prepare()
+        if args.reset:
+            await runner.reset()
+
+        indexes = await runner.drop_secondary_indexes()
+        await runner.backfill()
+        if indexes:
+            console.print(f"[cyan]→ Rebuilding {len(indexes)} index(es)[/cyan]")
+            await runner.rebuild_secondary_indexes(indexes)
+
+        counts = await runner.finalize()
+        runner.display_summary(counts, time.perf_counter() - started)
+
+        if any(c["old"] != c["new"] for c in counts):
+            console.print("[red]Migration counts do not match! Re-run to resume or inspect system.sync_logs.[/red]")
+            sys.exit(2)
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user; re-run to resume from the last checkpoint[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    finally:
+        await runner.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
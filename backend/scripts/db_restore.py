@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Database Restore Utility
+Parallel restore of db-backup.sh backup sets with per-phase timing and validation
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import asyncpg
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+console = Console()
+
+# Query parameters libpq understands; anything else (e.g. search_path) is dropped
+LIBPQ_URL_PARAMS = {
+    "sslmode", "sslrootcert", "sslcert", "sslkey", "connect_timeout",
+    "application_name", "options", "target_session_attrs",
+}
+
+EXPECTED_SCHEMAS = ["users", "content", "analytics", "campaigns", "system"]
+
+# Each check returns the offending objects; an empty result means it passed
+VALIDATION_CHECKS = {
+    "missing_schemas": """
+        SELECT s FROM unnest($1::text[]) AS s
+        WHERE s NOT IN (SELECT nspname FROM pg_namespace)
+    """,
+    "invalid_indexes": """
+        SELECT i.indexrelid::regclass::text
+        FROM pg_index i
+        WHERE NOT i.indisvalid OR NOT i.indisready
+    """,
+    "unvalidated_constraints": """
+        SELECT conrelid::regclass::text || ' ' || conname
+        FROM pg_constraint
+        WHERE NOT convalidated AND conrelid <> 0
+    """,
+    "empty_partitioned_tables": """
+        SELECT pt.partrelid::regclass::text
+        FROM pg_partitioned_table pt
+        WHERE NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhparent = pt.partrelid)
+    """,
+}
+
+
+def libpq_url(database_url: str) -> str:
+    """Convert an application DATABASE_URL into a URI pg_restore accepts"""
+    parts = urlsplit(database_url)
+    scheme = parts.scheme.split("+", 1)[0]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if k in LIBPQ_URL_PARAMS])
+    return urlunsplit((scheme, parts.netloc, parts.path, query, parts.fragment))
+
+
+def load_restore_set(backup_dir: str, timestamp: str) -> List[str]:
+    """Resolve backup_<timestamp>.files into absolute paths (base dump first)"""
+    restore_set = os.path.join(backup_dir, f"backup_{timestamp}.files")
+    if os.path.exists(restore_set):
+        with open(restore_set, 'r') as f:
+            files = [line.strip() for line in f if line.strip()]
+    else:
+        # Backups taken before restore sets existed are a single full dump
+        files = [f"postgresql_{timestamp}.dump.gz"]
+
+    paths = [os.path.join(backup_dir, name) for name in files]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"Backup set {timestamp} is incomplete: {', '.join(missing)}")
+    return paths
+
+
+class DatabaseRestorer:
+    def __init__(self, database_url: str, jobs: int = 4, maintenance_work_mem: str = "1GB"):
+        self.database_url = database_url
+        self.restore_url = libpq_url(database_url)
+        self.jobs = jobs
+        self.maintenance_work_mem = maintenance_work_mem
+        self.timings: Dict[str, float] = {}
+
+    async def _timed(self, phase: str, coro):
+        """Run a restore phase and record its wall-clock time in seconds"""
+        console.print(f"[cyan]→ {phase}[/cyan]")
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.timings[phase] = time.perf_counter() - start
+            console.print(f"  [green]{phase} finished in {self.timings[phase]:.2f}s[/green]")
+
+    async def _pg_restore(self, dump_file: str, *args: str, options: Optional[str] = None):
+        """Run pg_restore against the target database"""
+        env = dict(os.environ)
+        if options:
+            env["PGOPTIONS"] = options
+
+        process = await asyncio.create_subprocess_exec(
+            "pg_restore", "--no-owner", "--exit-on-error", "-d", self.restore_url, *args, dump_file,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"pg_restore {' '.join(args)} {dump_file} failed: {stderr.decode().strip()}")
+
+    async def _decompress(self, paths: List[str], workdir: str) -> List[str]:
+        """pg_restore --jobs needs a seekable archive, so inflate gzipped dumps first"""
+        def inflate(path: str) -> str:
+            target = os.path.join(workdir, os.path.basename(path)[:-3])
+            with gzip.open(path, 'rb') as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, length=1024 * 1024)
+            return target
+
+        return await asyncio.gather(*[
+            asyncio.to_thread(inflate, p) if p.endswith(".gz") else asyncio.sleep(0, result=p)
+            for p in paths
+        ])
+
+    async def _drop_schemas(self):
+        """Drop the application schemas so the restore starts from an empty database
+
+        pg_restore --clean only drops objects of the sections being restored,
+        which fails on foreign keys that belong to the post-data section.
+        """
+        conn = await asyncpg.connect(self.restore_url)
+        try:
+            for schema in EXPECTED_SCHEMAS:
+                await conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+        finally:
+            await conn.close()
+
+    async def _restore_snapshots(self, snapshots: List[str]):
+        """Load partition data snapshots concurrently, bounded by the job count"""
+        semaphore = asyncio.Semaphore(self.jobs)
+
+        async def restore_one(snapshot: str):
+            async with semaphore:
+                await self._pg_restore(snapshot, "--data-only", options="-c synchronous_commit=off")
+
+        await asyncio.gather(*[restore_one(s) for s in snapshots])
+
+    async def restore(self, paths: List[str], clean: bool = False) -> Dict[str, float]:
+        """Restore a backup set: schema, data, then indexes and constraints
+
+        Only the pre-data section (tables, types, functions) is created before
+        loading rows; indexes, primary keys, foreign keys and triggers live in
+        the post-data section and are built in parallel once all data is in.
+        """
+        with tempfile.TemporaryDirectory(prefix="ytempire_restore_") as workdir:
+            paths = await self._timed("decompress", self._decompress(paths, workdir))
+            base, snapshots = paths[0], paths[1:]
+
+            if clean:
+                await self._timed("clean", self._drop_schemas())
+            await self._timed("pre-data", self._pg_restore(base, "--section=pre-data"))
+
+            async def load_data():
+                await self._pg_restore(
+                    base, "--section=data", f"--jobs={self.jobs}",
+                    options="-c synchronous_commit=off"
+                )
+                await self._restore_snapshots(snapshots)
+
+            await self._timed("data", load_data())
+            await self._timed("post-data", self._pg_restore(
+                base, "--section=post-data", f"--jobs={self.jobs}",
+                options=f"-c maintenance_work_mem={self.maintenance_work_mem}"
+            ))
+
+        return self.timings
+
+    async def validate(self) -> Dict[str, Any]:
+        """Refresh statistics, run integrity checks and count rows per table"""
+        pool = await asyncpg.create_pool(self.restore_url, min_size=1, max_size=self.jobs)
+        try:
+            async def analyze():
+                async with pool.acquire() as conn:
+                    await conn.execute("ANALYZE")
+
+            await self._timed("analyze", analyze())
+
+            async def run_checks():
+                checks = {}
+                async with pool.acquire() as conn:
+                    for name, query in VALIDATION_CHECKS.items():
+                        args = [EXPECTED_SCHEMAS] if "$1" in query else []
+                        checks[name] = [r[0] for r in await conn.fetch(query, *args)]
+
+                    tables = await conn.fetch("""
+                        SELECT format('%I.%I', schemaname, relname) AS name
+                        FROM pg_stat_user_tables
+                        ORDER BY schemaname, relname
+                    """)
+
+                async def count(table: str):
+                    async with pool.acquire() as conn:
+                        return table, await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+
+                row_counts = dict(await asyncio.gather(*[count(t["name"]) for t in tables]))
+                return {"checks": checks, "row_counts": row_counts}
+
+            return await self._timed("validate", run_checks())
+        finally:
+            await pool.close()
+
+    def display_report(self, report: Dict[str, Any]):
+        """Display phase timings and validation results"""
+        timing_table = Table(title="Restore Phases")
+        timing_table.add_column("Phase", style="cyan")
+        timing_table.add_column("Duration", style="green", justify="right")
+
+        for phase, seconds in report["timings"].items():
+            timing_table.add_row(phase, f"{seconds:.2f}s")
+        timing_table.add_row("[bold]total (RTO)[/bold]", f"[bold]{report['total_seconds']:.2f}s[/bold]")
+
+        console.print(timing_table)
+
+        failed = {name: rows for name, rows in report["checks"].items() if rows}
+        row_total = sum(report["row_counts"].values())
+        console.print(Panel(
+            f"[cyan]Tables:[/cyan] {len(report['row_counts'])}\n"
+            f"[cyan]Rows:[/cyan] {row_total}\n"
+            f"[cyan]Checks passed:[/cyan] {len(report['checks']) - len(failed)} of {len(report['checks'])}"
+            + "".join(f"\n[red]{name}:[/red] {', '.join(map(str, rows[:5]))}" for name, rows in failed.items()),
+            title="Validation",
+            border_style="red" if failed else "green"
+        ))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Database Restore Utility")
+    parser.add_argument("--timestamp", "-t", help="Backup set timestamp written by db-backup.sh")
+    parser.add_argument("--file", "-f", help="Restore a single pg_dump custom-format archive instead of a set")
+    parser.add_argument("--backup-dir", default=os.getenv("BACKUP_DIR", "/backups"), help="Directory holding backup sets")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 4, help="Parallel restore jobs")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="maintenance_work_mem for index builds")
+    parser.add_argument("--clean", action="store_true", help="Drop the application schemas before restoring")
+    parser.add_argument("--skip-validation", action="store_true", help="Skip ANALYZE and validation queries")
+    parser.add_argument("--database-url", help="Target database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    if not shutil.which("pg_restore"):
+        console.print("[red]Error: pg_restore not found on PATH[/red]")
+        sys.exit(1)
+
+    restorer = DatabaseRestorer(database_url, args.jobs, args.maintenance_work_mem)
+
+    try:
+        if args.file:
+            paths = [args.file]
+        elif args.timestamp:
+            paths = load_restore_set(args.backup_dir, args.timestamp)
+        else:
+            console.print("[yellow]No backup specified. Use --timestamp or --file.[/yellow]")
+            sys.exit(1)
+
+        console.print(f"[green]Restoring {len(paths)} archive(s) with {args.jobs} jobs[/green]")
+        await restorer.restore(paths, clean=args.clean)
+
+        report = {"checks": {}, "row_counts": {}}
+        if not args.skip_validation:
+            report = await restorer.validate()
+
+        report["timings"] = restorer.timings
+        report["total_seconds"] = sum(restorer.timings.values())
+        report["archives"] = paths
+        report["jobs"] = args.jobs
+        restorer.display_report(report)
+
+        # Save results to file
+        output_file = f"restore_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        console.print(f"\n[green]Report saved to {output_file}[/green]")
+
+        if any(report["checks"].values()):
+            sys.exit(2)
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Database Router Utility
+Route read-only queries to streaming replicas within a replay lag bound
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+from rich.console import Console
+from rich.table import Table
+import os
+from dotenv import load_dotenv
+
+from metrics import observe_pool_wait
+
+load_dotenv()
+
+console = Console()
+
+# A replica is current when it has replayed up to the primary's WAL position
+# read just before it. Receive and replay positions alone cannot tell an idle
+# primary from a stalled or disconnected WAL stream: either way the replica
+# has replayed everything it received. Behind the primary, the age of the
+# last replayed commit bounds how stale it is.
+PRIMARY_LSN_QUERY = "SELECT pg_current_wal_lsn()::text"
+
+LAG_QUERY = """
+SELECT
+    pg_is_in_recovery() AS in_recovery,
+    CASE
+        WHEN NOT pg_is_in_recovery() THEN true
+        ELSE COALESCE(pg_last_wal_replay_lsn() >= $1::pg_lsn, false)
+    END AS caught_up,
+    COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 'Infinity')::float8 AS replay_age
+"""
+
+
+def replica_urls_from_env() -> List[str]:
+    """Comma-separated replica URLs from DATABASE_REPLICA_URLS"""
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+class DatabaseNode:
+    def __init__(self, name: str, url: str, replica: bool):
+        self.name = name
+        self.url = url
+        self.replica = replica
+        self.pool = None
+        self.in_recovery: Optional[bool] = None
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        # When the replica was last seen at or past the primary's WAL position
+        self.caught_up_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def effective_lag(self) -> float:
+        """Last measured lag plus the time since it was measured"""
+        if self.lag is None or self.checked_at is None:
+            return float("inf")
+        return self.lag + (time.monotonic() - self.checked_at)
+
+    def in_use(self) -> int:
+        return self.pool.get_size() - self.pool.get_idle_size() if self.pool else 0
+
+
+class ReplicaRouter:
+    def __init__(self, primary_url: str, replica_urls: List[str], max_lag: float = 5.0,
+                 pool_size: int = 10, check_interval: float = 1.0, statement_cache: bool = True,
+                 min_pool_size: int = 1):
+        self.primary = DatabaseNode("primary", primary_url, replica=False)
+        self.replicas = [DatabaseNode(f"replica{i + 1}", url, replica=True) for i, url in enumerate(replica_urls)]
+        # Default staleness bound for reads that do not pass their own
+        self.max_lag = max_lag
+        self.pool_size = pool_size
+        self.min_pool_size = min(min_pool_size, pool_size)
+        self.check_interval = check_interval
+        self.statement_cache_size = 100 if statement_cache else 0
+        self.routed = Counter()
+        self.fallbacks = Counter()
+        self._turn = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def nodes(self) -> List[DatabaseNode]:
+        return [self.primary] + self.replicas
+
+    async def start(self):
+        """Open one pool per node and start watching replica lag"""
+        for node in self.nodes:
+            try:
+                node.pool = await asyncpg.create_pool(
+                    node.url, min_size=self.min_pool_size, max_size=self.pool_size,
+                    statement_cache_size=self.statement_cache_size,
+                )
+            except Exception as e:
+                if not node.replica:
+                    raise
+                node.error = str(e)
+                console.print(f"[yellow]Warning: {node.name} unavailable: {e}[/yellow]")
+        await self.check_lag()
+        self._monitor = asyncio.create_task(self._watch())
+
+    async def close(self):
+        if self._monitor:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+        for node in self.nodes:
+            if node.pool:
+                await node.pool.close()
+
+    async def _primary_lsn(self) -> Optional[str]:
+        try:
+            async with self.primary.pool.acquire(timeout=self.check_interval) as conn:
+                return await conn.fetchval(PRIMARY_LSN_QUERY, timeout=self.check_interval)
+        except Exception as e:
+            console.print(f"[yellow]Warning: cannot read the primary WAL position: {e}[/yellow]")
+            return None
+
+    async def _check(self, node: DatabaseNode, primary_lsn: Optional[str], read_at: float):
+        if not node.pool:
+            return
+        try:
+            async with node.pool.acquire(timeout=self.check_interval) as conn:
+                row = await conn.fetchrow(LAG_QUERY, primary_lsn, timeout=self.check_interval)
+            node.in_recovery = row["in_recovery"]
+            if row["caught_up"]:
+                node.caught_up_at = read_at
+                node.lag = time.monotonic() - read_at
+            else:
+                since = time.monotonic() - node.caught_up_at if node.caught_up_at is not None else float("inf")
+                node.lag = min(row["replay_age"], since)
+            node.error = None
+        except Exception as e:
+            node.lag = None
+            node.error = str(e) or type(e).__name__
+        node.checked_at = time.monotonic()
+
+    async def check_lag(self):
+        if not self.replicas:
+            return
+        read_at = time.monotonic()
+        primary_lsn = await self._primary_lsn() if self.primary.pool else None
+        await asyncio.gather(*[self._check(node, primary_lsn, read_at) for node in self.replicas])
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_lag()
+
+    def choose(self, max_lag: Optional[float] = None) -> DatabaseNode:
+        """Least busy replica within the lag bound, else the primary"""
+        bound = self.max_lag if max_lag is None else max_lag
+        candidates = [
+            node for node in self.replicas
+            if node.pool and node.in_recovery and node.effective_lag() <= bound
+        ]
+        if not candidates:
+            if self.replicas:
+                self.fallbacks["lag" if any(n.pool and n.in_recovery for n in self.replicas) else "unavailable"] += 1
+            return self.primary
+
+        least = min(node.in_use() for node in candidates)
+        candidates = [node for node in candidates if node.in_use() == least]
+        return candidates[next(self._turn) % len(candidates)]
+
+    @asynccontextmanager
+    async def acquire(self, read_only: bool = True, max_lag: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+        """Connection from the node a query should run on; writes always use the primary"""
+        node = self.choose(max_lag) if read_only else self.primary
+        self.routed[node.name] += 1
+        started = time.perf_counter()
+        async with node.pool.acquire() as conn:
+            observe_pool_wait(node.name, time.perf_counter() - started)
+            yield conn
+
+    async def fetch(self, query: str, *args, max_lag: Optional[float] = None) -> List[asyncpg.Record]:
+        async with self.acquire(max_lag=max_lag) as conn:
+            return await conn.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args, max_lag: Optional[float] = None) -> Optional[asyncpg.Record]:
+        async with self.acquire(max_lag=max_lag) as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args, max_lag: Optional[float] = None) -> Any:
+        async with self.acquire(max_lag=max_lag) as conn:
+            return await conn.fetchval(query, *args)
+
+    async def execute(self, query: str, *args) -> str:
+        async with self.acquire(read_only=False) as conn:
+            return await conn.execute(query, *args)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Role, lag and pool usage of every node"""
+        return [
+            {
+                "node": node.name,
+                "replica": node.replica,
+                "in_recovery": node.in_recovery,
+                "lag_seconds": None if not node.replica else (
+                    round(node.lag, 3) if node.lag is not None else None
+                ),
+                "eligible": node.replica and bool(node.pool and node.in_recovery)
+                            and node.effective_lag() <= self.max_lag,
+                "pool_size": node.pool.get_size() if node.pool else 0,
+                "in_use": node.in_use(),
+                "routed": self.routed[node.name],
+                "error": node.error,
+            }
+            for node in self.nodes
+        ]
+
+    def display_status(self):
+        """Display node lag and routing counts"""
+        table = Table(title=f"Database Nodes (max lag {self.max_lag}s)")
+        table.add_column("Node", style="cyan")
+        table.add_column("Role")
+        table.add_column("Lag", justify="right")
+        table.add_column("Eligible")
+        table.add_column("Pool", justify="right")
+        table.add_column("Routed", justify="right")
+        table.add_column("Error", style="red")
+
+        for entry in self.status():
+            role = "replica" if entry["replica"] else "primary"
+            if entry["replica"] and entry["in_recovery"] is False:
+                role = "replica (not in recovery)"
+            lag = "-" if not entry["replica"] else (
+                f"{entry['lag_seconds']:.3f}s" if entry["lag_seconds"] is not None else "unknown"
+            )
+            table.add_row(
+                entry["node"], role, lag,
+                "" if not entry["replica"] else ("[green]yes[/green]" if entry["eligible"] else "[red]no[/red]"),
+                f"{entry['in_use']}/{entry['pool_size']}",
+                str(entry["routed"]),
+                (entry["error"] or "")[:60],
+            )
+        console.print(table)
+        if self.fallbacks:
+            console.print(f"[yellow]Primary fallbacks: {dict(self.fallbacks)}[/yellow]")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Database Router Utility")
+    parser.add_argument("--status", action="store_true", help="Show node roles, replay lag and eligibility")
+    parser.add_argument("--watch", type=float, help="Refresh the status every N seconds")
+    parser.add_argument("--query", "-q", help="Run a read-only query through the router")
+    parser.add_argument("--max-lag", type=float, default=5.0, help="Seconds of replay lag a read may tolerate")
+    parser.add_argument("--replica-url", action="append", default=None,
+                        help="Replica URL (repeatable; defaults to DATABASE_REPLICA_URLS)")
+    parser.add_argument("--database-url", help="Primary database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+    replica_urls = args.replica_url or replica_urls_from_env()
+    if not replica_urls:
+        console.print("[yellow]No replicas configured; every query will use the primary[/yellow]")
+
+    router = ReplicaRouter(database_url, replica_urls, max_lag=args.max_lag)
+
+    try:
+        await router.start()
+
+        if args.query:
+            async with router.acquire() as conn:
+                rows = await conn.fetch(args.query)
+            served_by = [name for name, count in router.routed.items() if count][0]
+            console.print(f"[green]{len(rows)} rows from {served_by}[/green]")
+            print(json.dumps([dict(r) for r in rows[:100]], indent=2, default=str))
+        elif args.watch:
+            while True:
+                console.clear()
+                console.print(f"[dim]{datetime.now().isoformat()}[/dim]")
+                router.display_status()
+                await asyncio.sleep(args.watch)
+        else:
+            router.display_status()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    finally:
+        await router.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Search Utility
+Ranked full-text search over channels and videos using the GIN search indexes
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import sys
+import time
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+import redis.asyncio as redis
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+import os
+from dotenv import load_dotenv
+
+from metrics import observe_pool_wait, observe_query, percentile, record_cache, start_metrics_server
+
+load_dotenv()
+
+console = Console()
+
+# "document" must stay identical to the expressions of idx_channels_search and
+# idx_videos_search in 08-indexes-performance.sql; any other spelling of the
+# tsvector expression cannot use the GIN index and scans the whole table.
+SEARCH_TARGETS = {
+    "videos": {
+        "table": "content.videos",
+        "key": "video_id",
+        "index": "idx_videos_search",
+        "document": "to_tsvector('english', title || ' ' || COALESCE(description, ''))",
+        "columns": "video_id, channel_id, title, view_count, published_at",
+        "filter": "privacy_status = 'public'",
+    },
+    "channels": {
+        "table": "content.channels",
+        "key": "channel_id",
+        "index": "idx_channels_search",
+        "document": "to_tsvector('english', channel_name || ' ' || COALESCE(description, ''))",
+        "columns": "channel_id, channel_name, subscriber_count, view_count",
+        "filter": "status = 'active'",
+    },
+}
+
+# Words used for the synthetic titles of the benchmark data set
+SEED_WORDS = [
+    "gaming", "tutorial", "review", "unboxing", "minecraft", "recipe", "travel", "vlog",
+    "python", "music", "live", "highlights", "budget", "guide", "challenge", "reaction",
+    "fitness", "workout", "podcast", "interview", "trailer", "setup", "tips", "beginner",
+]
+
+SEED_PREFIX = "search-bench"
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and collapse whitespace so equivalent searches share a cache entry"""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def encode_cursor(rank: float, key: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, str(key)]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    rank, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return float(rank), key
+
+
+def result_row(row: asyncpg.Record) -> Dict[str, Any]:
+    """A result row with UUIDs and datetimes as strings, the same whether fresh or cached"""
+    return {
+        column: value.isoformat() if isinstance(value, (date, datetime))
+        else str(value) if isinstance(value, uuid.UUID) else value
+        for column, value in row.items()
+    }
+
+
+def build_search_sql(target: str) -> str:
+    """Keyset-paginated search ordered by (rank DESC, key)"""
+    spec = SEARCH_TARGETS[target]
+    rank = f"ts_rank({spec['document']}, websearch_to_tsquery('english', $1))"
+    return f"""
+        SELECT {spec['columns']}, {rank} AS rank
+        FROM {spec['table']}
+        WHERE {spec['document']} @@ websearch_to_tsquery('english', $1)
+          AND {spec['filter']}
+          AND ($2::real IS NULL
+               OR {rank} < $2::real
+               OR ({rank} = $2::real AND {spec['key']} > $3::uuid))
+        ORDER BY rank DESC, {spec['key']}
+        LIMIT $4
+    """
+
+
+class SearchService:
+    def __init__(self, database_url: str, redis_url: Optional[str] = None,
+                 cache_ttl: int = 60, pool_size: int = 10):
+        self.database_url = database_url
+        self.redis_url = redis_url
+        self.cache_ttl = cache_ttl
+        self.pool_size = pool_size
+        self.pool = None
+        self.client = None
+        self.queries = {target: build_search_sql(target) for target in SEARCH_TARGETS}
+
+    async def connect(self):
+        self.pool = await asyncpg.create_pool(self.database_url, min_size=1, max_size=self.pool_size)
+        if self.redis_url:
+            self.client = await redis.from_url(self.redis_url)
+            await self.client.ping()
+
+    async def disconnect(self):
+        if self.pool:
+            await self.pool.close()
+        if self.client:
+            await self.client.close()
+
+    @staticmethod
+    def cache_key(target: str, query: str, cursor: Optional[str], limit: int) -> str:
+        digest = hashlib.sha256(f"search:{target}:{query}:{cursor or ''}:{limit}".encode()).hexdigest()
+        return f"cache:query:{digest}"
+
+    async def search(self, target: str, query: str, limit: int = 20,
+                     cursor: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """One page of ranked results plus the cursor for the next page"""
+        if target not in SEARCH_TARGETS:
+            raise ValueError(f"Unknown search target: {target}")
+        normalized = normalize_query(query)
+        if not normalized:
+            return {"target": target, "query": normalized, "results": [], "next_cursor": None, "cached": False}
+
+        key = self.cache_key(target, normalized, cursor, limit)
+        if use_cache and self.client:
+            cached = await self.client.get(key)
+            record_cache(key, cached is not None)
+            if cached is not None:
+                page = json.loads(cached)
+                page["cached"] = True
+                return page
+
+        after_rank, after_key = decode_cursor(cursor) if cursor else (None, None)
+        started = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            acquired = time.perf_counter()
+            rows = await conn.fetch(self.queries[target], normalized, after_rank, after_key, limit)
+        observe_pool_wait("search", acquired - started)
+        observe_query(self.queries[target], time.perf_counter() - acquired)
+
+        results = [result_row(row) for row in rows]
+        key_column = SEARCH_TARGETS[target]["key"]
+        next_cursor = None
+        if len(results) == limit:
+            last = results[-1]
+            next_cursor = encode_cursor(last["rank"], last[key_column])
+
+        page = {
+            "target": target,
+            "query": normalized,
+            "results": results,
+            "next_cursor": next_cursor,
+            "cached": False,
+        }
+        if self.client:
+            await self.client.set(key, json.dumps(page), ex=self.cache_ttl)
+        return page
+
+    async def explain(self, target: str, query: str, limit: int = 20,
+                      force_index: bool = False) -> Dict[str, Any]:
+        """Check that the search plan goes through the GIN index
+
+        force_index disables sequential scans for the check, so on a small
+        table it still shows whether the expression can use the index at all.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if force_index:
+                    await conn.execute("SET LOCAL enable_seqscan = off")
+                plan = await conn.fetchval(
+                    f"EXPLAIN (FORMAT JSON) {self.queries[target]}",
+                    normalize_query(query), None, None, limit
+                )
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+
+        indexes = []
+
+        def walk(node: Dict[str, Any]):
+            if "Index Name" in node:
+                indexes.append(node["Index Name"])
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return {
+            "target": target,
+            "index": SEARCH_TARGETS[target]["index"],
+            "uses_index": SEARCH_TARGETS[target]["index"] in indexes,
+            "indexes": indexes,
+        }
+
+    async def seed_videos(self, count: int, batch_size: int = 100000) -> int:
+        """Insert synthetic public videos for benchmarking, tagged with SEED_PREFIX"""
+        async with self.pool.acquire() as conn:
+            account_id = await conn.fetchval("""
+                INSERT INTO users.accounts (email, username, password_hash, account_type)
+                VALUES ($1 || '@example.com', $1, 'x', 'creator')
+                ON CONFLICT (username) DO UPDATE SET updated_at = NOW()
+                RETURNING account_id
+            """, SEED_PREFIX)
+            channel_id = await conn.fetchval("""
+                INSERT INTO content.channels (account_id, youtube_channel_id, channel_name)
+                VALUES ($1, $2, 'Search Benchmark')
+                ON CONFLICT (youtube_channel_id) DO UPDATE SET updated_at = NOW()
+                RETURNING channel_id
+            """, account_id, SEED_PREFIX)
+            existing = await conn.fetchval(
+                "SELECT COUNT(*) FROM content.videos WHERE channel_id = $1", channel_id
+            )
+
+            for start in range(existing + 1, count + 1, batch_size):
+                end = min(start + batch_size - 1, count)
+                await conn.execute("""
+                    INSERT INTO content.videos
+                        (channel_id, youtube_video_id, title, description, privacy_status,
+                         published_at, view_count)
+                    SELECT $1, $2 || '-' || i,
+                           w[1 + (i * 7) % n] || ' ' || w[1 + (i * 13) % n] || ' ' || w[1 + (i * 31) % n],
+                           w[1 + (i * 17) % n] || ' ' || w[1 + (i * 5) % n] || ' episode ' || i,
+                           'public', NOW() - (i % 1000) * INTERVAL '1 hour', (i * 7919) % 1000000
+                    FROM generate_series($3::int, $4::int) AS i,
+                         (SELECT $5::text[] AS w, cardinality($5::text[]) AS n) words
+                    ON CONFLICT (youtube_video_id) DO NOTHING
+                """, channel_id, SEED_PREFIX, start, end, SEED_WORDS)
+                console.print(f"[dim]  seeded {end} videos[/dim]")
+
+            await conn.execute("ANALYZE content.videos")
+            return await conn.fetchval(
+                "SELECT COUNT(*) FROM content.videos WHERE channel_id = $1", channel_id
+            )
+
+    async def benchmark(self, target: str, terms: List[str], iterations: int = 50,
+                        limit: int = 20) -> Dict[str, Any]:
+        """Latency of uncached searches, cached searches and keyset page walks"""
+        timings: Dict[str, List[float]] = {"uncached": [], "cached": [], "page_3": []}
+
+        for i in range(iterations):
+            term = terms[i % len(terms)]
+
+            started = time.perf_counter()
+            await self.search(target, term, limit, use_cache=False)
+            timings["uncached"].append(time.perf_counter() - started)
+
+            if self.client:
+                started = time.perf_counter()
+                await self.search(target, term, limit)
+                timings["cached"].append(time.perf_counter() - started)
+
+            cursor = None
+            for _ in range(2):
+                page = await self.search(target, term, limit, cursor, use_cache=False)
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            if cursor:
+                started = time.perf_counter()
+                await self.search(target, term, limit, cursor, use_cache=False)
+                timings["page_3"].append(time.perf_counter() - started)
+
+        def to_ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "target": target,
+            "terms": terms,
+            "iterations": iterations,
+            "latency_ms": {
+                name: {
+                    "samples": len(values),
+                    "p50": to_ms(percentile(values, 50)),
+                    "p95": to_ms(percentile(values, 95)),
+                    "p99": to_ms(percentile(values, 99)),
+                }
+                for name, values in timings.items()
+            },
+        }
+
+    def display_page(self, page: Dict[str, Any]):
+        """Display one page of search results"""
+        spec = SEARCH_TARGETS[page["target"]]
+        columns = [c.strip() for c in spec["columns"].split(",")]
+
+        table = Table(title=f"Search '{page['query']}' in {page['target']}"
+                            f"{' (cached)' if page['cached'] else ''}")
+        table.add_column("rank", style="cyan", justify="right")
+        for column in columns:
+            table.add_column(column)
+        for row in page["results"]:
+            table.add_row(f"{row['rank']:.4f}", *[str(row[c]) for c in columns])
+        console.print(table)
+
+        if page["next_cursor"]:
+            console.print(f"[dim]Next page: --cursor {page['next_cursor']}[/dim]")
+
+    def display_benchmark(self, report: Dict[str, Any]):
+        """Display benchmark latency percentiles"""
+        table = Table(title=f"Search Benchmark ({report['target']}, {report['iterations']} iterations)")
+        table.add_column("Path", style="cyan")
+        table.add_column("Samples", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p95 ms", justify="right")
+        table.add_column("p99 ms", justify="right")
+        for name, stats in report["latency_ms"].items():
+            table.add_row(name, str(stats["samples"]), str(stats["p50"]), str(stats["p95"]), str(stats["p99"]))
+        console.print(table)
+
+        plan = report["plan"]
+        style = "green" if plan["uses_index"] else "red"
+        console.print(Panel(
+            f"[cyan]Expected index:[/cyan] {plan['index']}\n"
+            f"[cyan]Plan indexes:[/cyan] {', '.join(plan['indexes']) or 'none (sequential scan)'}",
+            title="Query Plan",
+            border_style=style
+        ))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Search Utility")
+    parser.add_argument("query", nargs="?", help="Search terms (websearch syntax: quotes, OR, -word)")
+    parser.add_argument("--target", "-t", choices=list(SEARCH_TARGETS), default="videos", help="What to search")
+    parser.add_argument("--limit", "-l", type=int, default=20, help="Results per page")
+    parser.add_argument("--cursor", help="Cursor of the page to fetch, from a previous search")
+    parser.add_argument("--cache-ttl", type=int, default=60, help="Seconds to cache a result page")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the Redis result cache")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark search latency")
+    parser.add_argument("--terms", default="gaming tutorial,minecraft,python -music,\"budget travel\",review OR reaction",
+                        help="Comma-separated search terms for --benchmark")
+    parser.add_argument("--iterations", "-n", type=int, default=50, help="Searches per benchmark path")
+    parser.add_argument("--seed", type=int, help="Seed synthetic public videos up to this count before benchmarking")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port during the benchmark")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+    parser.add_argument("--redis-url", help="Redis URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+    redis_url = None if args.no_cache else args.redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    service = SearchService(database_url, redis_url, cache_ttl=args.cache_ttl)
+
+    try:
+        if args.metrics_port:
+            await start_metrics_server(args.metrics_port)
+            console.print(f"[green]Metrics on http://127.0.0.1:{args.metrics_port}/metrics[/green]")
+
+        await service.connect()
+
+        if args.seed:
+            total = await service.seed_videos(args.seed)
+            console.print(f"[green]{total} benchmark videos present[/green]")
+
+        if args.benchmark:
+            terms = [t.strip() for t in args.terms.split(",") if t.strip()]
+            report = await service.benchmark(args.target, terms, args.iterations, args.limit)
+            report["plan"] = await service.explain(args.target, terms[0], args.limit)
+            report["timestamp"] = datetime.now().isoformat()
+            service.display_benchmark(report)
+
+            output_file = f"search_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(output_file, 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            console.print(f"\n[green]Results saved to {output_file}[/green]")
+        elif args.query:
+            page = await service.search(args.target, args.query, args.limit, args.cursor,
+                                        use_cache=not args.no_cache)
+            service.display_page(page)
+        elif not args.seed:
+            parser.print_help()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    finally:
+        await service.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Debug Shell Utility
+Run database and cache debug commands against warm connections from one long-lived process
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import signal
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Only the standard library is imported up front so that --connect stays a
+# thin client; the debuggers, SQLAlchemy, the Redis client and rich are
+# loaded by the session the first time a command needs them.
+
+load_dotenv()
+
+PROMPT = "ytempire> "
+# Ends each response on the socket; debug output never contains a NUL
+TERMINATOR = "\0"
+# Columns of captured output: rich cannot see the client's terminal, and its
+# 80-column default for non-terminals wraps plans and result tables
+CAPTURE_WIDTH = 200
+
+HELP = """Database:
+  sql QUERY               Run a query and show its EXPLAIN ANALYZE plan
+  run QUERY               Run a query without the plan
+  connections             Active database connections
+  stats SCHEMA.TABLE      Table size, vacuum and index statistics
+  health [--json]         Bloat and autovacuum health of every table
+  export FILE QUERY       Stream a query result to .csv, .arrow or .parquet
+Cache:
+  get KEY                 Key value and metadata
+  mget KEY [KEY ...]      Pipelined get of many keys
+  set KEY VALUE [TTL]     Set a key
+  del KEY [KEY ...]       Unlink keys
+  keys PATTERN            Keys matching a pattern
+  info                    Server, hit rate and memory statistics
+Shell:
+  timing on|off           Print the time each command takes
+  help                    This message
+  quit                    End the session (or this client's connection)"""
+
+
+class DebugSession:
+    def __init__(self, database_url: Optional[str], redis_url: str, batch_size: int = 50000,
+                 width: Optional[int] = None):
+        self.database_url = database_url
+        self.redis_url = redis_url
+        self.batch_size = batch_size
+        # Fixed output width, for sessions whose output is captured; None follows the terminal
+        self.width = width
+        self.timing = True
+        self.console = None
+        self._db = None
+        self._redis = None
+        # One command at a time: socket clients share the connections and the console
+        self._lock = asyncio.Lock()
+        self.commands: Dict[str, Callable[[str], Awaitable[None]]] = {
+            "sql": self.cmd_sql,
+            "run": self.cmd_run,
+            "connections": self.cmd_connections,
+            "stats": self.cmd_stats,
+            "health": self.cmd_health,
+            "export": self.cmd_export,
+            "get": self.cmd_get,
+            "mget": self.cmd_mget,
+            "set": self.cmd_set,
+            "del": self.cmd_del,
+            "keys": self.cmd_keys,
+            "info": self.cmd_info,
+            "timing": self.cmd_timing,
+            "help": self.cmd_help,
+        }
+
+    def _load_console(self):
+        if self.console is None:
+            from rich.console import Console
+
+            self.console = Console(width=self.width, soft_wrap=self.width is not None)
+
+    def db(self):
+        """Database debugger, created with its connection pool on first use"""
+        if self._db is None:
+            if not self.database_url:
+                raise RuntimeError("DATABASE_URL not found in environment or arguments")
+            import db_debug
+
+            # Pooled connections can be dropped while the shell sits idle
+            self._db = db_debug.DatabaseDebugger(self.database_url, echo=False, pool_pre_ping=True)
+            db_debug.console = self.console
+        return self._db
+
+    async def cache(self):
+        """Redis debugger, connected on first use"""
+        if self._redis is None:
+            import redis_debug
+
+            redis_debug.console = self.console
+            debugger = redis_debug.RedisDebugger(self.redis_url, health_check_interval=30)
+            await debugger.connect()
+            self._redis = debugger
+        return self._redis
+
+    async def close(self):
+        if self._redis:
+            await self._redis.disconnect()
+        if self._db:
+            self._db.engine.dispose()
+
+    async def execute(self, line: str, capture: bool = False) -> Optional[str]:
+        """Run one command line; returns its output when captured"""
+        self._load_console()
+        async with self._lock:
+            if not capture:
+                await self._dispatch(line)
+                return None
+            with self.console.capture() as output:
+                await self._dispatch(line)
+            return output.get()
+
+    async def _dispatch(self, line: str):
+        name, _, rest = line.strip().partition(" ")
+        handler = self.commands.get(name.lower())
+        if handler is None:
+            self.console.print(f"[red]Unknown command '{name}'. Type 'help' for commands.[/red]")
+            return
+
+        started = time.perf_counter()
+        try:
+            await handler(rest.strip())
+        except Exception as e:
+            self.console.print(f"[red]Error: {e}[/red]")
+        if self.timing and name.lower() not in ("help", "timing"):
+            self.console.print(f"[dim]({(time.perf_counter() - started) * 1000:.1f} ms)[/dim]")
+
+    @staticmethod
+    def _args(rest: str, minimum: int, usage: str) -> List[str]:
+        args = shlex.split(rest)
+        if len(args) < minimum:
+            raise ValueError(f"usage: {usage}")
+        return args
+
+    async def cmd_sql(self, rest: str, explain: bool = True):
+        if not rest:
+            raise ValueError("usage: sql QUERY")
+        debugger = self.db()
+        result = await debugger.analyze_query(rest, explain)
+        if not result["error"]:
+            debugger.display_results(result)
+
+    async def cmd_run(self, rest: str):
+        await self.cmd_sql(rest, explain=False)
+
+    async def cmd_connections(self, rest: str):
+        await self.db().monitor_connections()
+
+    async def cmd_stats(self, rest: str):
+        schema, _, table = rest.partition(".")
+        if not schema or not table:
+            raise ValueError("usage: stats SCHEMA.TABLE")
+        await self.db().analyze_table_stats(schema, table)
+
+    async def cmd_health(self, rest: str):
+        debugger = self.db()
+        report = await debugger.table_health()
+        if rest == "--json":
+            self.console.print_json(json.dumps(report, default=str))
+        else:
+            debugger.display_health(report)
+
+    async def cmd_export(self, rest: str):
+        from db_debug import EXPORT_FORMATS
+
+        output_file, _, query = rest.partition(" ")
+        fmt = EXPORT_FORMATS.get(os.path.splitext(output_file)[1].lower())
+        if not fmt or not query.strip():
+            raise ValueError("usage: export FILE.{csv,arrow,parquet} QUERY")
+        export = await self.db().export_query(query, output_file, fmt, self.batch_size)
+        rows = export["rows"] if export["rows"] is not None else "unknown"
+        self.console.print(f"[green]{rows} rows, {export['bytes']:,} bytes written to {output_file}[/green]")
+
+    async def cmd_get(self, rest: str):
+        key = self._args(rest, 1, "get KEY")[0]
+        debugger = await self.cache()
+        debugger.display_key_info(await debugger.get_key(key))
+
+    async def cmd_mget(self, rest: str):
+        keys = self._args(rest, 1, "mget KEY [KEY ...]")
+        debugger = await self.cache()
+        debugger.display_bulk_results(await debugger.bulk_get(keys))
+
+    async def cmd_set(self, rest: str):
+        args = self._args(rest, 2, "set KEY VALUE [TTL]")
+        ttl = int(args[2]) if len(args) > 2 else None
+        await (await self.cache()).set_key(args[0], args[1], ttl)
+
+    async def cmd_del(self, rest: str):
+        keys = self._args(rest, 1, "del KEY [KEY ...]")
+        deleted = await (await self.cache()).bulk_delete(keys)
+        self.console.print(f"[green]{deleted} of {len(keys)} keys deleted[/green]")
+
+    async def cmd_keys(self, rest: str):
+        pattern = self._args(rest, 1, "keys PATTERN")[0]
+        keys = await (await self.cache()).search_keys(pattern)
+        for key in keys[:200]:
+            self.console.print(key, highlight=False)
+        self.console.print(f"[cyan]Total: {len(keys)} keys[/cyan]")
+
+    async def cmd_info(self, rest: str):
+        await (await self.cache()).analyze_cache_stats()
+
+    async def cmd_timing(self, rest: str):
+        if rest not in ("on", "off"):
+            raise ValueError("usage: timing on|off")
+        self.timing = rest == "on"
+
+    async def cmd_help(self, rest: str):
+        self.console.print(HELP, highlight=False, markup=False)
+
+
+def is_quit(line: str) -> bool:
+    return line.strip().lower() in ("quit", "exit")
+
+
+async def read_line(prompt: Optional[str]) -> Optional[str]:
+    """Next stdin line, or None at end of input
+
+    Read on a daemon thread so a blocked prompt cannot hold up exit after Ctrl+C.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(line: Optional[str]):
+        if not future.done():
+            future.set_result(line)
+
+    def read():
+        try:
+            line = input(prompt) if prompt is not None else (sys.stdin.readline() or None)
+        except EOFError:
+            line = None
+        loop.call_soon_threadsafe(deliver, line)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+async def run_stdin(session: DebugSession):
+    """Read commands from stdin: an interactive prompt on a terminal, a script otherwise"""
+    interactive = sys.stdin.isatty()
+    if interactive:
+        try:
+            import readline  # noqa: F401  (history and line editing for input())
+        except ImportError:
+            pass
+
+    while True:
+        line = await read_line(PROMPT if interactive else None)
+        if line is None or is_quit(line):
+            break
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        await session.execute(line)
+
+
+async def serve_socket(session: DebugSession, path: str):
+    """Serve commands on a Unix socket until SIGTERM or Ctrl+C
+
+    Each client sends one command per line and reads its output up to a
+    NUL line. Commands from concurrent clients run one at a time.
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = (await reader.readline()).decode()
+                if not line or is_quit(line):
+                    break
+                output = "" if not line.strip() else await session.execute(line, capture=True)
+                writer.write((output + TERMINATOR + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    # Owner only from the moment it is bound: the shell runs arbitrary SQL
+    # with the daemon's credentials
+    umask = os.umask(0o077)
+    try:
+        server = await asyncio.start_unix_server(handle, path)
+    finally:
+        os.umask(umask)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    print(f"Listening on {path}", file=sys.stderr)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        os.unlink(path)
+
+
+async def run_client(path: str, commands: List[str]) -> int:
+    """Send commands to a running shell and print each response"""
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+    except OSError as e:
+        print(f"Error: cannot connect to {path}: {e}", file=sys.stderr)
+        return 1
+
+    lines = commands or (line for line in sys.stdin)
+    try:
+        for line in lines:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            if is_quit(line):
+                break
+            writer.write((line.rstrip("\n") + "\n").encode())
+            await writer.drain()
+            while True:
+                response = (await reader.readline()).decode()
+                if not response:
+                    print("Error: shell closed the connection", file=sys.stderr)
+                    return 1
+                if response.rstrip("\n") == TERMINATOR:
+                    break
+                sys.stdout.write(response)
+            sys.stdout.flush()
+    finally:
+        writer.close()
+    return 0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Debug Shell Utility")
+    parser.add_argument("--socket", "-s", help="Serve commands on this Unix socket instead of stdin")
+    parser.add_argument("--connect", help="Send commands to a shell serving this Unix socket")
+    parser.add_argument("--command", "-c", action="append", default=[],
+                        help="Command to send with --connect (repeatable; default reads stdin)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per record batch when exporting")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+    parser.add_argument("--redis-url", help="Redis URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    if args.connect:
+        sys.exit(await run_client(args.connect, args.command))
+
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    redis_url = args.redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    session = DebugSession(database_url, redis_url, args.batch_size,
+                           width=CAPTURE_WIDTH if args.socket else None)
+
+    try:
+        if args.metrics_port:
+            from metrics import start_metrics_server
+
+            await start_metrics_server(args.metrics_port)
+        if args.socket:
+            await serve_socket(session, args.socket)
+        else:
+            await run_stdin(session)
+    finally:
+        # Also runs when Ctrl+C cancels this task
+        await session.close()
+
+
+if __name__ == "__main__":
+    # asyncio.run() turns Ctrl+C into cancelling main() and raises
+    # KeyboardInterrupt only once it has unwound, so it is caught here
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nInterrupted by user", file=sys.stderr)
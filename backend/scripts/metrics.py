@@ -0,0 +1,195 @@
+"""
+YTEmpire Metrics Utility
+In-process counters and latency histograms exported in Prometheus text format
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds; spans a Redis round trip to a slow dashboard query
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# Metrics are updated from the event loop thread only, so plain dict and
+# list updates are safe and an increment costs no more than a dict lookup.
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *label_values: str, value: float):
+        self.values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self.values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *label_values: str):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = format_labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {total:.6f}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self.metrics.setdefault(name, Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "ytempire_cache_requests_total", "Cache lookups by key namespace and result", ("namespace", "result"))
+QUERY_SECONDS = REGISTRY.histogram(
+    "ytempire_query_duration_seconds", "Query latency by normalised query fingerprint", ("fingerprint",))
+QUERY_INFO = REGISTRY.gauge(
+    "ytempire_query_fingerprint_info", "Normalised query text of each fingerprint", ("fingerprint", "query"))
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "ytempire_pool_wait_seconds", "Time spent waiting for a pooled connection", ("pool",))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def cache_namespace(key: str) -> str:
+    """Namespace of a cache key: 'yt:video:<id>' -> 'yt:video', 'yt:analytics:channel:..' -> 'yt:analytics:channel'"""
+    parts = key.split(":")
+    return ":".join(parts[:3] if parts[:2] == ["yt", "analytics"] else parts[:2])
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """Short stable id for a query with literals and parameters replaced by '?'"""
+    normalized = _WHITESPACE.sub(" ", _LITERALS.sub("?", query)).strip().rstrip(";")
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    QUERY_INFO.set(digest, normalized[:200], value=1)
+    return digest
+
+
+def record_cache(key: str, hit: bool):
+    CACHE_REQUESTS.inc(cache_namespace(key), "hit" if hit else "miss")
+
+
+def observe_query(query: str, seconds: float):
+    QUERY_SECONDS.observe(seconds, fingerprint(query))
+
+
+def observe_pool_wait(pool: str, seconds: float):
+    POOL_WAIT_SECONDS.observe(seconds, pool)
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1",
+                               registry: MetricsRegistry = REGISTRY) -> asyncio.AbstractServer:
+    """Serve GET /metrics from the running event loop"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode(errors="replace").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Redis Cardinality Utility
+Approximate distinct counts per channel, video and period with HyperLogLog
+"""
+
+import argparse
+import asyncio
+import calendar
+import json
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import asyncpg
+import redis.asyncio as redis
+from rich.console import Console
+from rich.table import Table
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+console = Console()
+
+# Sketches live in the analytics namespace as
+#   yt:analytics:hll-{entity}-{dimension}:{id}:{YYYY-MM-DD | YYYY-MM}
+# Each costs at most 12 kB and counts with a standard error of 0.81%.
+#
+# "entities" queries yield (entity_id, date, member) rows for ingest from
+# Postgres and "exact" queries the COUNT(DISTINCT) they approximate.
+# Dimensions without a query (unique viewers) are fed by the application.
+DIMENSIONS = {
+    "countries": {
+        "entities": {
+            "channel": """
+                SELECT DISTINCT channel_id, date, country_code
+                FROM analytics.audience_demographics
+                WHERE date BETWEEN $1 AND $2
+            """,
+        },
+        "exact": {
+            "channel": """
+                SELECT COUNT(DISTINCT country_code) FROM analytics.audience_demographics
+                WHERE channel_id = $1 AND date BETWEEN $2 AND $3
+            """,
+        },
+    },
+    "traffic_sources": {
+        "entities": {
+            "channel": """
+                SELECT DISTINCT channel_id, date, source_type || ':' || COALESCE(source_detail, '')
+                FROM analytics.traffic_sources
+                WHERE date BETWEEN $1 AND $2
+            """,
+            "video": """
+                SELECT DISTINCT video_id, date, source_type || ':' || COALESCE(source_detail, '')
+                FROM analytics.traffic_sources
+                WHERE video_id IS NOT NULL AND date BETWEEN $1 AND $2
+            """,
+        },
+        "exact": {
+            "channel": """
+                SELECT COUNT(DISTINCT source_type || ':' || COALESCE(source_detail, ''))
+                FROM analytics.traffic_sources
+                WHERE channel_id = $1 AND date BETWEEN $2 AND $3
+            """,
+            "video": """
+                SELECT COUNT(DISTINCT source_type || ':' || COALESCE(source_detail, ''))
+                FROM analytics.traffic_sources
+                WHERE video_id = $1 AND date BETWEEN $2 AND $3
+            """,
+        },
+    },
+    "viewers": {
+        "entities": {},
+        "exact": {},
+    },
+}
+
+# Day sketches are kept for a year and a bit; month rollups for three years.
+# Months before the current one are counted from their rollup sketch.
+DAY_TTL = 400 * 86400
+MONTH_TTL = 3 * 366 * 86400
+
+
+def sketch_key(dimension: str, entity: str, entity_id: Any, period: str) -> str:
+    return f"yt:analytics:hll-{entity}-{dimension}:{entity_id}:{period}"
+
+
+def day_sketches_expired(month: date) -> bool:
+    """Whether some day sketches of a month may be past DAY_TTL, so it cannot be re-rolled"""
+    return month.replace(day=1) < date.today() - timedelta(seconds=DAY_TTL)
+
+
+def period_keys(dimension: str, entity: str, entity_id: Any, start: date, end: date,
+                closed_months: Optional[Set[str]] = None) -> List[str]:
+    """Keys covering [start, end]: month rollups for whole months, day sketches for the rest"""
+    keys = []
+    day = start
+    while day <= end:
+        month_end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        month = day.strftime("%Y-%m")
+        if day.day == 1 and month_end <= end and (closed_months is None or month in closed_months):
+            keys.append(sketch_key(dimension, entity, entity_id, month))
+            day = month_end + timedelta(days=1)
+        else:
+            keys.append(sketch_key(dimension, entity, entity_id, day.isoformat()))
+            day += timedelta(days=1)
+    return keys
+
+
+class CardinalityEstimator:
+    def __init__(self, redis_url: str, database_url: Optional[str] = None, chunk_size: int = 5000):
+        self.redis_url = redis_url
+        self.database_url = database_url
+        self.chunk_size = chunk_size
+        self.client = None
+        self.pool = None
+
+    async def connect(self):
+        """Connect to Redis, and to Postgres when a database URL is given"""
+        self.client = await redis.from_url(self.redis_url)
+        await self.client.ping()
+        if self.database_url:
+            self.pool = await asyncpg.create_pool(self.database_url, min_size=1, max_size=2)
+
+    async def disconnect(self):
+        if self.client:
+            await self.client.close()
+        if self.pool:
+            await self.pool.close()
+
+    async def add(self, dimension: str, entity: str, rows: Iterable[Tuple[Any, date, Any]]) -> int:
+        """PFADD (entity_id, date, member) rows into their day sketches, one pipeline per call"""
+        this_month = date.today().strftime("%Y-%m")
+        members: Dict[str, List[str]] = defaultdict(list)
+        rollup_members: Dict[str, List[str]] = defaultdict(list)
+        stale_rollups = set()
+        for entity_id, day, member in rows:
+            month_key = sketch_key(dimension, entity, entity_id, day.strftime("%Y-%m"))
+            if day_sketches_expired(day):
+                # Its day sketches are gone, so rebuilding the rollup would lose
+                # counts: add straight into the rollup instead
+                rollup_members[month_key].append(str(member))
+                continue
+            members[sketch_key(dimension, entity, entity_id, day.isoformat())].append(str(member))
+            if day.strftime("%Y-%m") < this_month:
+                stale_rollups.add(month_key)
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, values in members.items():
+                pipe.pfadd(key, *values)
+                pipe.expire(key, DAY_TTL)
+            for key, values in rollup_members.items():
+                pipe.pfadd(key, *values)
+                pipe.expire(key, MONTH_TTL, nx=True)
+            # Late data for a closed month: drop its rollup so the next count rebuilds it
+            if stale_rollups:
+                pipe.unlink(*stale_rollups)
+            await pipe.execute()
+        return len(members) + len(rollup_members)
+
+    async def rollup_month(self, dimension: str, entity: str, entity_id: Any, month: date) -> str:
+        """PFMERGE a month's day sketches into its month sketch"""
+        last = calendar.monthrange(month.year, month.month)[1]
+        days = [sketch_key(dimension, entity, entity_id, month.replace(day=d).isoformat()) for d in range(1, last + 1)]
+        dest = sketch_key(dimension, entity, entity_id, month.strftime("%Y-%m"))
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.pfmerge(dest, *days)
+            pipe.expire(dest, MONTH_TTL)
+            await pipe.execute()
+        return dest
+
+    async def count(self, dimension: str, entity: str, entity_id: Any, start: date, end: date) -> int:
+        """Approximate distinct members over [start, end], merged on the fly by PFCOUNT"""
+        this_month = date.today().strftime("%Y-%m")
+        closed = []
+        day = start.replace(day=1)
+        while day <= end:
+            month_end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+            if day >= start and month_end <= end and day.strftime("%Y-%m") < this_month:
+                closed.append(day)
+            day = month_end + timedelta(days=1)
+
+        if closed:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for month in closed:
+                    pipe.exists(sketch_key(dimension, entity, entity_id, month.strftime("%Y-%m")))
+                present = await pipe.execute()
+            for month, exists in zip(closed, present):
+                if not exists and not day_sketches_expired(month):
+                    await self.rollup_month(dimension, entity, entity_id, month)
+
+        keys = period_keys(dimension, entity, entity_id, start, end, {m.strftime("%Y-%m") for m in closed})
+        return await self.client.pfcount(*keys)
+
+    async def ingest(self, start: date, end: date, dimensions: Optional[List[str]] = None) -> Dict[str, int]:
+        """Fill day sketches from Postgres, then roll up every closed month touched"""
+        counts = {}
+        touched: Set[Tuple[str, str, Any, date]] = set()
+        this_month = date.today().strftime("%Y-%m")
+
+        async with self.pool.acquire() as conn:
+            for dimension in dimensions or list(DIMENSIONS):
+                for entity, query in DIMENSIONS[dimension]["entities"].items():
+                    rows_seen = 0
+                    async with conn.transaction():
+                        cursor = await conn.cursor(query, start, end)
+                        while True:
+                            rows = await cursor.fetch(self.chunk_size)
+                            if not rows:
+                                break
+                            await self.add(dimension, entity, [tuple(r) for r in rows])
+                            rows_seen += len(rows)
+                            for entity_id, day, _ in rows:
+                                if day.strftime("%Y-%m") < this_month and not day_sketches_expired(day):
+                                    touched.add((dimension, entity, entity_id, day.replace(day=1)))
+                    counts[f"{entity}_{dimension}"] = rows_seen
+
+        for dimension, entity, entity_id, month in touched:
+            await self.rollup_month(dimension, entity, entity_id, month)
+        counts["month_rollups"] = len(touched)
+        return counts
+
+    async def verify(self, dimension: str, entity: str, entity_id: Any, start: date, end: date) -> Dict[str, Any]:
+        """Compare the estimate and its latency with COUNT(DISTINCT)"""
+        query = DIMENSIONS[dimension]["exact"].get(entity)
+        if not query:
+            raise ValueError(f"No exact query for {entity} {dimension}")
+
+        started = time.perf_counter()
+        estimate = await self.count(dimension, entity, entity_id, start, end)
+        estimate_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            exact = await conn.fetchval(query, entity_id, start, end)
+        exact_ms = (time.perf_counter() - started) * 1000
+
+        return {
+            "dimension": dimension,
+            "entity": entity,
+            "id": str(entity_id),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "estimate": estimate,
+            "exact": exact,
+            "error": round(abs(estimate - exact) / exact, 4) if exact else None,
+            "estimate_ms": round(estimate_ms, 3),
+            "exact_ms": round(exact_ms, 3),
+        }
+
+    def display_counts(self, title: str, counts: List[Dict[str, Any]]):
+        """Display estimates, with exact counts when verified"""
+        table = Table(title=title)
+        table.add_column("Dimension", style="cyan")
+        table.add_column("Window")
+        table.add_column("Estimate", style="green", justify="right")
+        table.add_column("Exact", justify="right")
+        table.add_column("Error", justify="right")
+        table.add_column("HLL ms", justify="right")
+        table.add_column("SQL ms", justify="right")
+        for entry in counts:
+            table.add_row(
+                entry["dimension"],
+                f"{entry['start']} → {entry['end']}",
+                str(entry["estimate"]),
+                str(entry.get("exact", "-")),
+                f"{entry['error']:.2%}" if entry.get("error") is not None else "-",
+                str(entry.get("estimate_ms", "-")),
+                str(entry.get("exact_ms", "-")),
+            )
+        console.print(table)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Redis Cardinality Utility")
+    parser.add_argument("--ingest", action="store_true", help="Fill sketches from Postgres for the window")
+    parser.add_argument("--dimension", "-D", choices=list(DIMENSIONS), action="append",
+                        help="Dimension to ingest or count (repeatable; default all)")
+    parser.add_argument("--channel-id", help="Count for a channel")
+    parser.add_argument("--video-id", help="Count for a video")
+    parser.add_argument("--days", "-d", type=int, default=30, help="Window length in days, ending today")
+    parser.add_argument("--verify", action="store_true", help="Compare estimates with COUNT(DISTINCT)")
+    parser.add_argument("--json", action="store_true", help="Print counts as JSON")
+    parser.add_argument("--redis-url", help="Redis URL (overrides environment variable)")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    redis_url = args.redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if (args.ingest or args.verify) and not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    end = date.today()
+    start = end - timedelta(days=args.days - 1)
+    estimator = CardinalityEstimator(redis_url, database_url)
+
+    try:
+        await estimator.connect()
+
+        if args.ingest:
+            counts = await estimator.ingest(start, end, args.dimension)
+            console.print(f"[green]Ingested {counts}[/green]")
+
+        if args.channel_id or args.video_id:
+            entity, entity_id = ("video", args.video_id) if args.video_id else ("channel", args.channel_id)
+            results = []
+            for dimension in args.dimension or list(DIMENSIONS):
+                if args.verify and entity in DIMENSIONS[dimension]["exact"]:
+                    results.append(await estimator.verify(dimension, entity, entity_id, start, end))
+                else:
+                    started = time.perf_counter()
+                    estimate = await estimator.count(dimension, entity, entity_id, start, end)
+                    results.append({
+                        "dimension": dimension,
+                        "entity": entity,
+                        "id": entity_id,
+                        "start": start.isoformat(),
+                        "end": end.isoformat(),
+                        "estimate": estimate,
+                        "estimate_ms": round((time.perf_counter() - started) * 1000, 3),
+                    })
+
+            if args.json:
+                print(json.dumps(results, indent=2, default=str))
+            else:
+                estimator.display_counts(f"Distinct counts for {entity} {entity_id}", results)
+        elif not args.ingest:
+            parser.print_help()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    finally:
+        await estimator.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,13 +9,11 @@ import asyncio
 import json
 import sys
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import redis.asyncio as redis
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from rich.progress import track
 import os
 from dotenv import load_dotenv
 
@@ -25,13 +23,18 @@ console = Console()
 
 
 class RedisDebugger:
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, health_check_interval: int = 0):
         self.redis_url = redis_url
+        # Seconds a pooled connection may sit idle before it is PINGed on reuse
+        self.health_check_interval = health_check_interval
         self.client = None
         
     async def connect(self):
         """Connect to Redis"""
-        self.client = await redis.from_url(self.redis_url)
+        # Imported here: the client accounts for most of this module's start-up time
+        import redis.asyncio as redis
+
+        self.client = await redis.from_url(self.redis_url, health_check_interval=self.health_check_interval)
         await self.client.ping()
         console.print("[green]Connected to Redis[/green]")
     
@@ -115,7 +118,8 @@ class RedisDebugger:
     async def delete_key(self, key: str) -> bool:
         """Delete a key from Redis"""
         try:
-            result = await self.client.delete(key)
+            # UNLINK reclaims the value's memory in a background thread
+            result = await self.client.unlink(key)
             if result:
                 console.print(f"[green]Key '{key}' deleted successfully[/green]")
             else:
@@ -125,6 +129,83 @@ class RedisDebugger:
             console.print(f"[red]Error deleting key: {e}[/red]")
             return False
     
+    async def bulk_get(self, keys: List[str], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """Get many keys with two pipelined round trips per chunk"""
+        results = []
+        readers = {
+            "string": lambda pipe, key: pipe.get(key),
+            "hash": lambda pipe, key: pipe.hgetall(key),
+            "list": lambda pipe, key: pipe.lrange(key, 0, -1),
+            "set": lambda pipe, key: pipe.smembers(key),
+            "zset": lambda pipe, key: pipe.zrange(key, 0, -1, withscores=True),
+        }
+
+        for chunk in chunked(keys, chunk_size):
+            # Round trip 1: type and TTL of every key in the chunk
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in chunk:
+                    pipe.type(key)
+                    pipe.ttl(key)
+                meta = await pipe.execute()
+
+            chunk_results = []
+            for i, key in enumerate(chunk):
+                key_type = meta[2 * i]
+                key_type = key_type.decode() if isinstance(key_type, bytes) else key_type
+                ttl = meta[2 * i + 1]
+                chunk_results.append({
+                    "key": key,
+                    "exists": key_type != "none",
+                    "type": key_type if key_type != "none" else None,
+                    "value": None,
+                    "ttl": (ttl if ttl >= 0 else "No expiration") if key_type != "none" else None,
+                })
+
+            # Round trip 2: values, read with the command matching each type
+            readable = [r for r in chunk_results if r["type"] in readers]
+            async with self.client.pipeline(transaction=False) as pipe:
+                for r in readable:
+                    readers[r["type"]](pipe, r["key"])
+                values = await pipe.execute(raise_on_error=False)
+
+            for r, value in zip(readable, values):
+                if isinstance(value, Exception):
+                    r["error"] = str(value)
+                    continue
+                if isinstance(value, bytes):
+                    value = value.decode()
+                    try:
+                        value = json.loads(value)
+                    except:
+                        pass
+                r["value"] = value
+
+            results.extend(chunk_results)
+
+        return results
+
+    async def bulk_set(self, items: List[Tuple[str, str]], ttl: Optional[int] = None,
+                       chunk_size: int = 500) -> int:
+        """Set many keys, one pipelined round trip per chunk"""
+        written = 0
+        for chunk in chunked(items, chunk_size):
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in chunk:
+                    try:
+                        value = json.dumps(json.loads(value))
+                    except:
+                        pass
+                    pipe.set(key, value, ex=ttl or None)
+                written += sum(1 for ok in await pipe.execute() if ok)
+        return written
+
+    async def bulk_delete(self, keys: List[str], chunk_size: int = 500) -> int:
+        """Delete many keys with one non-blocking UNLINK per chunk"""
+        deleted = 0
+        for chunk in chunked(keys, chunk_size):
+            deleted += await self.client.unlink(*chunk)
+        return deleted
+
     async def search_keys(self, pattern: str) -> List[str]:
         """Search for keys matching a pattern"""
         try:
@@ -210,11 +291,17 @@ class RedisDebugger:
         stats_table.add_column("Metric", style="cyan")
         stats_table.add_column("Value", style="green")
         
+        # Server-wide keyspace counters; hit rates per key namespace are
+        # exported by the metrics endpoint as ytempire_cache_requests_total
+        hits = info.get("keyspace_hits", 0)
+        lookups = hits + info.get("keyspace_misses", 0)
         stats = {
             "Total Keys": info.get("db0", {}).get("keys", 0) if isinstance(info.get("db0"), dict) else 0,
             "Total Commands Processed": info.get("total_commands_processed", 0),
             "Instantaneous Ops/Sec": info.get("instantaneous_ops_per_sec", 0),
-            "Hit Rate": f"{info.get('keyspace_hit_ratio', 0):.2%}" if 'keyspace_hit_ratio' in info else "N/A",
+            "Keyspace Hits": hits,
+            "Keyspace Misses": info.get("keyspace_misses", 0),
+            "Hit Rate": f"{hits / lookups:.2%}" if lookups else "N/A",
             "Evicted Keys": info.get("evicted_keys", 0),
             "Expired Keys": info.get("expired_keys", 0)
         }
@@ -241,6 +328,30 @@ class RedisDebugger:
         
         console.print(memory_table)
     
+    def display_bulk_results(self, results: List[Dict[str, Any]]):
+        """Display bulk get results as a table"""
+        table = Table(title=f"Bulk Get ({len(results)} keys)")
+        table.add_column("Key", style="cyan")
+        table.add_column("Type", style="green")
+        table.add_column("TTL", style="yellow")
+        table.add_column("Value Preview", style="white")
+
+        for key_info in results:
+            value_preview = str(key_info.get("error") or key_info["value"])
+            if len(value_preview) > 50:
+                value_preview = value_preview[:47] + "..."
+
+            table.add_row(
+                key_info["key"],
+                key_info["type"] or "missing",
+                str(key_info["ttl"]) if key_info["ttl"] is not None else "N/A",
+                value_preview if key_info["exists"] else ""
+            )
+
+        console.print(table)
+        found = sum(1 for r in results if r["exists"])
+        console.print(f"\n[cyan]Found: {found} of {len(results)} keys[/cyan]")
+
     def display_key_info(self, key_info: Dict[str, Any]):
         """Display key information in a formatted way"""
         # Key metadata
@@ -264,6 +375,22 @@ class RedisDebugger:
                 console.print(key_info["value"])
 
 
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Split a list into consecutive chunks of at most `size` items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def read_key_lines(source: str) -> List[str]:
+    """Read non-empty lines from a file, or from stdin when source is '-'"""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
 async def main():
     parser = argparse.ArgumentParser(description="YTEmpire Redis Cache Debug Utility")
     parser.add_argument("--operation", "-o", choices=["get", "set", "delete", "keys", "info", "monitor"], 
@@ -273,6 +400,10 @@ async def main():
     parser.add_argument("--ttl", "-t", type=int, help="TTL in seconds")
     parser.add_argument("--pattern", "-p", default="*", help="Key pattern for search/monitor")
     parser.add_argument("--interval", "-i", type=int, default=5, help="Monitor interval in seconds")
+    parser.add_argument("--keys-file", "-K",
+                       help="Bulk get/set/delete keys listed in a file ('-' for stdin); "
+                            "for set, each line is '<key> <value>' unless --value is given")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Keys per pipeline in bulk operations")
     parser.add_argument("--redis-url", help="Redis URL (overrides environment variable)")
     
     args = parser.parse_args()
@@ -285,7 +416,30 @@ async def main():
     try:
         await debugger.connect()
         
-        if args.operation == "get" and args.key:
+        if args.keys_file and args.operation in ("get", "set", "delete"):
+            lines = read_key_lines(args.keys_file)
+            
+            if args.operation == "get":
+                results = await debugger.bulk_get(lines, args.chunk_size)
+                debugger.display_bulk_results(results)
+                
+            elif args.operation == "set":
+                if args.value is not None:
+                    items = [(key, args.value) for key in lines]
+                else:
+                    items = [tuple(line.split(None, 1)) for line in lines]
+                    invalid = [item[0] for item in items if len(item) != 2]
+                    if invalid:
+                        console.print(f"[red]Error: no value for key(s): {', '.join(invalid[:5])}[/red]")
+                        sys.exit(1)
+                written = await debugger.bulk_set(items, args.ttl, args.chunk_size)
+                console.print(f"[green]{written} of {len(items)} keys set successfully[/green]")
+                
+            else:
+                deleted = await debugger.bulk_delete(lines, args.chunk_size)
+                console.print(f"[green]{deleted} of {len(lines)} keys deleted[/green]")
+            
+        elif args.operation == "get" and args.key:
             key_info = await debugger.get_key(args.key)
             debugger.display_key_info(key_info)
             
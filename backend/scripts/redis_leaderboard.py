@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+YTEmpire Redis Leaderboard Utility
+Maintain top video and channel boards by views as Redis sorted sets
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import asyncpg
+import redis.asyncio as redis
+from rich.console import Console
+from rich.table import Table
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+console = Console()
+
+# Key layout:
+#   yt:lb:{scope}:all              all-time view_count
+#   yt:lb:{scope}:day:{YYYY-MM-DD} views on one day
+#   yt:lb:{scope}:{N}d             union of the last N day sets, cached briefly
+# where scope is "videos", "channels" or "channel:{channel_id}" (the videos of one channel).
+KEY_PREFIX = "yt:lb"
+
+WINDOWS = (7, 30)
+
+
+def board_key(scope: str, period: str) -> str:
+    return f"{KEY_PREFIX}:{scope}:{period}"
+
+
+def day_key(scope: str, day: date) -> str:
+    return board_key(scope, f"day:{day.isoformat()}")
+
+
+def decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class LeaderboardManager:
+    def __init__(self, redis_url: str, database_url: Optional[str] = None,
+                 max_size: int = 10000, window_ttl: int = 60, chunk_size: int = 5000):
+        self.redis_url = redis_url
+        self.database_url = database_url
+        # Global all-time boards are trimmed to this many members; per-channel boards are not
+        self.max_size = max_size
+        # Seconds a materialised N-day window is reused before it is rebuilt from the day sets
+        self.window_ttl = window_ttl
+        self.chunk_size = chunk_size
+        # Day sets outlive the longest window so it can always be rebuilt
+        self.day_ttl = (max(WINDOWS) + 2) * 86400
+        self.client = None
+        self.pool = None
+
+    async def connect(self):
+        """Connect to Redis, and to Postgres when a database URL is given"""
+        self.client = await redis.from_url(self.redis_url)
+        await self.client.ping()
+        if self.database_url:
+            self.pool = await asyncpg.create_pool(self.database_url, min_size=1, max_size=2)
+
+    async def disconnect(self):
+        if self.client:
+            await self.client.close()
+        if self.pool:
+            await self.pool.close()
+
+    # Incremental updates, called by the sync job with the values it just stored
+
+    async def update_video_totals(self, rows: Iterable[Tuple[Any, Any, int]], prefix: str = ""):
+        """Set all-time view counts from (video_id, channel_id, view_count) rows"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for video_id, channel_id, views in rows:
+                pipe.zadd(prefix + board_key("videos", "all"), {str(video_id): views})
+                pipe.zadd(prefix + board_key(f"channel:{channel_id}", "all"), {str(video_id): views})
+            pipe.zremrangebyrank(prefix + board_key("videos", "all"), 0, -self.max_size - 1)
+            await pipe.execute()
+
+    async def update_channel_totals(self, rows: Iterable[Tuple[Any, int]], prefix: str = ""):
+        """Set all-time view counts from (channel_id, view_count) rows"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for channel_id, views in rows:
+                pipe.zadd(prefix + board_key("channels", "all"), {str(channel_id): views})
+            pipe.zremrangebyrank(prefix + board_key("channels", "all"), 0, -self.max_size - 1)
+            await pipe.execute()
+
+    async def update_video_days(self, rows: Iterable[Tuple[Any, Any, date, int]], prefix: str = ""):
+        """Set daily views from (video_id, channel_id, date, views) rows
+
+        Scores are absolute, so replaying a sync is idempotent.
+        """
+        keys = set()
+        async with self.client.pipeline(transaction=False) as pipe:
+            for video_id, channel_id, day, views in rows:
+                for key in (day_key("videos", day), day_key(f"channel:{channel_id}", day)):
+                    pipe.zadd(prefix + key, {str(video_id): views})
+                    keys.add(prefix + key)
+            for key in keys:
+                pipe.expire(key, self.day_ttl)
+            await pipe.execute()
+
+    async def update_channel_days(self, rows: Iterable[Tuple[Any, date, int]], prefix: str = ""):
+        """Set daily views from (channel_id, date, views) rows"""
+        keys = set()
+        async with self.client.pipeline(transaction=False) as pipe:
+            for channel_id, day, views in rows:
+                key = prefix + day_key("channels", day)
+                pipe.zadd(key, {str(channel_id): views})
+                keys.add(key)
+            for key in keys:
+                pipe.expire(key, self.day_ttl)
+            await pipe.execute()
+
+    async def remove_videos(self, rows: Iterable[Tuple[Any, Any]]):
+        """Take (video_id, channel_id) rows off every board, e.g. when they stop being public"""
+        days = [date.today() - timedelta(days=i) for i in range(self.day_ttl // 86400)]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for video_id, channel_id in rows:
+                for scope in ("videos", f"channel:{channel_id}"):
+                    pipe.zrem(board_key(scope, "all"), str(video_id))
+                    for day in days:
+                        pipe.zrem(day_key(scope, day), str(video_id))
+            await pipe.execute()
+
+    async def remove_channels(self, channel_ids: Iterable[Any]):
+        """Take channels off the channel boards, e.g. when they stop being active"""
+        days = [date.today() - timedelta(days=i) for i in range(self.day_ttl // 86400)]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for channel_id in channel_ids:
+                pipe.zrem(board_key("channels", "all"), str(channel_id))
+                for day in days:
+                    pipe.zrem(day_key("channels", day), str(channel_id))
+            await pipe.execute()
+
+    # Reads
+
+    async def top(self, board: str = "videos", window: Optional[int] = None, limit: int = 10,
+                  channel_id: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Top members of a board, all-time or over the last `window` days"""
+        scope = f"channel:{channel_id}" if channel_id else board
+        if window is None:
+            key = board_key(scope, "all")
+        else:
+            key = board_key(scope, f"{window}d")
+            if not await self.client.exists(key):
+                today = date.today()
+                days = [day_key(scope, today - timedelta(days=i)) for i in range(window)]
+                async with self.client.pipeline(transaction=True) as pipe:
+                    pipe.zunionstore(key, days, aggregate="SUM")
+                    pipe.expire(key, self.window_ttl)
+                    await pipe.execute()
+
+        members = await self.client.zrevrange(key, 0, limit - 1, withscores=True)
+        return [(decode(member), int(score)) for member, score in members]
+
+    async def rank(self, member: str, board: str = "videos", channel_id: Optional[str] = None) -> Optional[int]:
+        """1-based all-time rank of a video or channel"""
+        scope = f"channel:{channel_id}" if channel_id else board
+        position = await self.client.zrevrank(board_key(scope, "all"), member)
+        return position + 1 if position is not None else None
+
+    # Feeding from Postgres
+
+    async def sync(self, since: datetime) -> Dict[str, int]:
+        """Push rows synced since a point in time"""
+        counts = {}
+        scopes = {"videos", "channels"}
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT video_id, channel_id, view_count, COALESCE(privacy_status = 'public', false) AS public
+                FROM content.videos
+                WHERE last_sync_at >= $1
+            """, since)
+            await self.update_video_totals([(r["video_id"], r["channel_id"], r["view_count"])
+                                            for r in rows if r["public"]])
+            await self.remove_videos([(r["video_id"], r["channel_id"]) for r in rows if not r["public"]])
+            scopes.update(f"channel:{r['channel_id']}" for r in rows)
+            counts["videos"] = sum(1 for r in rows if r["public"])
+            counts["videos_removed"] = len(rows) - counts["videos"]
+
+            rows = await conn.fetch("""
+                SELECT channel_id, view_count, COALESCE(status = 'active', false) AS active
+                FROM content.channels
+                WHERE last_sync_at >= $1
+            """, since)
+            await self.update_channel_totals([(r["channel_id"], r["view_count"]) for r in rows if r["active"]])
+            await self.remove_channels([r["channel_id"] for r in rows if not r["active"]])
+            counts["channels"] = sum(1 for r in rows if r["active"])
+            counts["channels_removed"] = len(rows) - counts["channels"]
+
+            # Daily rows are picked up by when they were written, so back-filled
+            # days land too; rows of the current day are re-read as they grow.
+            # Days older than the longest window never reach a board.
+            oldest = date.today() - timedelta(days=max(WINDOWS) - 1)
+            rows = await conn.fetch("""
+                SELECT va.video_id, v.channel_id, va.date, va.views
+                FROM analytics.video_analytics va
+                JOIN content.videos v ON v.video_id = va.video_id
+                WHERE (va.created_at >= $1 OR va.date >= $1::date)
+                  AND va.date >= $2 AND v.privacy_status = 'public'
+            """, since, oldest)
+            await self.update_video_days([tuple(r) for r in rows])
+            scopes.update(f"channel:{r['channel_id']}" for r in rows)
+            counts["video_days"] = len(rows)
+
+            rows = await conn.fetch("""
+                SELECT channel_id, date, views FROM analytics.channel_analytics
+                WHERE (created_at >= $1 OR date >= $1::date) AND date >= $2
+            """, since, oldest)
+            await self.update_channel_days([tuple(r) for r in rows])
+            counts["channel_days"] = len(rows)
+
+        await self._drop_windows(scopes)
+        return counts
+
+    async def rebuild(self) -> Dict[str, int]:
+        """Rebuild every board from Postgres and swap it in atomically per key"""
+        prefix = f"rebuild:{datetime.now().strftime('%Y%m%d%H%M%S')}:"
+        since = date.today() - timedelta(days=max(WINDOWS) - 1)
+        counts = {"videos": 0, "channels": 0, "video_days": 0, "channel_days": 0}
+
+        streams = [
+            ("videos", self.update_video_totals, """
+                SELECT video_id, channel_id, view_count FROM content.videos
+                WHERE privacy_status = 'public'
+            """, ()),
+            ("channels", self.update_channel_totals, """
+                SELECT channel_id, view_count FROM content.channels WHERE status = 'active'
+            """, ()),
+            ("video_days", self.update_video_days, """
+                SELECT va.video_id, v.channel_id, va.date, va.views
+                FROM analytics.video_analytics va
+                JOIN content.videos v ON v.video_id = va.video_id
+                WHERE va.date >= $1 AND v.privacy_status = 'public'
+            """, (since,)),
+            ("channel_days", self.update_channel_days, """
+                SELECT channel_id, date, views FROM analytics.channel_analytics WHERE date >= $1
+            """, (since,)),
+        ]
+
+        async with self.pool.acquire() as conn:
+            for name, update, query, args in streams:
+                async with conn.transaction():
+                    cursor = await conn.cursor(query, *args)
+                    while True:
+                        rows = await cursor.fetch(self.chunk_size)
+                        if not rows:
+                            break
+                        await update([tuple(r) for r in rows], prefix=prefix)
+                        counts[name] += len(rows)
+                console.print(f"[dim]  {name}: {counts[name]} rows[/dim]")
+
+        built = [decode(k) async for k in self.client.scan_iter(match=f"{prefix}{KEY_PREFIX}:*", count=1000)]
+        live = [decode(k) async for k in self.client.scan_iter(match=f"{KEY_PREFIX}:*", count=1000)]
+        targets = {key[len(prefix):] for key in built}
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in built:
+                # RENAME carries the day-set TTL over
+                pipe.rename(key, key[len(prefix):])
+            stale = [key for key in live if key not in targets]
+            if stale:
+                pipe.unlink(*stale)
+            await pipe.execute()
+
+        counts["keys"] = len(built)
+        return counts
+
+    async def _drop_windows(self, scopes: Iterable[str]):
+        """Forget materialised windows of the touched boards so the next read sees fresh day sets"""
+        keys = [board_key(scope, f"{window}d") for scope in scopes for window in WINDOWS]
+        for i in range(0, len(keys), self.chunk_size):
+            await self.client.unlink(*keys[i:i + self.chunk_size])
+
+    async def resolve_names(self, board: str, ids: List[str]) -> Dict[str, str]:
+        """Titles or channel names for display, when Postgres is available"""
+        if not self.pool or not ids:
+            return {}
+        if board == "channels":
+            query = "SELECT channel_id::text, channel_name FROM content.channels WHERE channel_id = ANY($1::uuid[])"
+        else:
+            query = "SELECT video_id::text, title FROM content.videos WHERE video_id = ANY($1::uuid[])"
+        async with self.pool.acquire() as conn:
+            return {r[0]: r[1] for r in await conn.fetch(query, ids)}
+
+    def display_board(self, title: str, entries: List[Tuple[str, int]], names: Dict[str, str]):
+        """Display a leaderboard"""
+        table = Table(title=title)
+        table.add_column("#", style="cyan", justify="right")
+        table.add_column("ID", style="dim")
+        table.add_column("Name")
+        table.add_column("Views", style="green", justify="right")
+        for position, (member, score) in enumerate(entries, 1):
+            table.add_row(str(position), member, names.get(member, ""), f"{score:,}")
+        console.print(table)
+
+
+def parse_window(value: str) -> Optional[int]:
+    if value == "all":
+        return None
+    days = int(value.rstrip("d"))
+    if days not in WINDOWS:
+        raise argparse.ArgumentTypeError(f"window must be 'all' or one of {', '.join(map(str, WINDOWS))}")
+    return days
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="YTEmpire Redis Leaderboard Utility")
+    parser.add_argument("--top", choices=["videos", "channels"], help="Show a leaderboard")
+    parser.add_argument("--window", "-w", type=parse_window, default=None,
+                        help="Board window: all (default), 7 or 30 days")
+    parser.add_argument("--channel-id", help="Show the top videos of one channel")
+    parser.add_argument("--limit", "-l", type=int, default=10, help="Number of entries")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild all boards from Postgres")
+    parser.add_argument("--sync-minutes", type=int, help="Push rows synced in the last N minutes")
+    parser.add_argument("--max-size", type=int, default=10000, help="Members kept on global all-time boards")
+    parser.add_argument("--json", action="store_true", help="Print the board as JSON")
+    parser.add_argument("--redis-url", help="Redis URL (overrides environment variable)")
+    parser.add_argument("--database-url", help="Database URL (overrides environment variable)")
+
+    args = parser.parse_args()
+
+    redis_url = args.redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if (args.rebuild or args.sync_minutes) and not database_url:
+        console.print("[red]Error: DATABASE_URL not found in environment or arguments[/red]")
+        sys.exit(1)
+
+    manager = LeaderboardManager(redis_url, database_url, max_size=args.max_size)
+
+    try:
+        await manager.connect()
+
+        if args.rebuild:
+            counts = await manager.rebuild()
+            console.print(f"[green]Rebuilt {counts['keys']} boards from {counts}[/green]")
+        elif args.sync_minutes:
+            counts = await manager.sync(datetime.now().astimezone() - timedelta(minutes=args.sync_minutes))
+            console.print(f"[green]Synced {counts}[/green]")
+
+        if args.top or args.channel_id:
+            board = "videos" if args.channel_id else args.top
+            entries = await manager.top(board, args.window, args.limit, args.channel_id)
+            if args.json:
+                print(json.dumps([{"id": m, "views": s} for m, s in entries], indent=2))
+            else:
+                names = await manager.resolve_names(board, [m for m, _ in entries])
+                window = "all time" if args.window is None else f"last {args.window} days"
+                scope = f"channel {args.channel_id}" if args.channel_id else board
+                manager.display_board(f"Top {scope} ({window})", entries, names)
+        elif not (args.rebuild or args.sync_minutes):
+            parser.print_help()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted by user[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    finally:
+        await manager.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
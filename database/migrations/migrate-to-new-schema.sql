@@ -1,6 +1,11 @@
 -- YTEmpire Schema Migration Script
 -- Migrates from old single-schema structure to new multi-schema structure
 -- IMPORTANT: Backup your database before running this migration!
+--
+-- This script copies every table in one transaction. For production volumes
+-- run backend/scripts/db_migrate.py instead: it performs Steps 3, 5 and 6 in
+-- keyset-paginated chunks, checkpoints progress in system.sync_logs so a
+-- failed run resumes where it stopped, and rebuilds indexes after the backfill.
 
 BEGIN;
 
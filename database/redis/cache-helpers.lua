@@ -7,10 +7,8 @@ local get_or_set = function(key, ttl, fetch_function)
     local value = redis.call('GET', key)
     
     if value then
-        redis.call('HINCRBY', 'yt:cache:stats', 'hits', 1)
         return value
     else
-        redis.call('HINCRBY', 'yt:cache:stats', 'misses', 1)
         -- In real implementation, fetch_function would be called from application
         -- This is a placeholder for the pattern
         return nil
@@ -31,9 +29,6 @@ local batch_get = function(keys)
         end
     end
     
-    redis.call('HINCRBY', 'yt:cache:stats', 'hits', #result.found)
-    redis.call('HINCRBY', 'yt:cache:stats', 'misses', #result.missing)
-    
     return result
 end
 
@@ -70,7 +65,6 @@ local invalidate_related = function(entity_type, entity_id)
         until cursor == "0"
     end
     
-    redis.call('HINCRBY', 'yt:cache:stats', 'invalidations', count)
     return count
 end
 
@@ -90,22 +84,22 @@ local cache_warm = function(entity_type, entity_ids, ttl)
         end
     end
     
-    redis.call('HINCRBY', 'yt:cache:stats', 'warmed', warmed)
     return warmed
 end
 
 -- Function: Get Cache Statistics
+-- Hits and misses are the server's own keyspace counters, so cache calls
+-- make no extra writes; per-namespace counts are exported by the
+-- application's metrics endpoint (ytempire_cache_requests_total)
 local get_cache_stats = function()
-    local stats = redis.call('HGETALL', 'yt:cache:stats')
     local result = {}
-    
-    for i = 1, #stats, 2 do
-        result[stats[i]] = stats[i + 1]
-    end
+    local stats = redis.call('INFO', 'stats')
     
     -- Calculate hit rate
-    local hits = tonumber(result.hits) or 0
-    local misses = tonumber(result.misses) or 0
+    local hits = tonumber(string.match(stats, "keyspace_hits:(%d+)")) or 0
+    local misses = tonumber(string.match(stats, "keyspace_misses:(%d+)")) or 0
+    result.hits = hits
+    result.misses = misses
     local total = hits + misses
     
     if total > 0 then
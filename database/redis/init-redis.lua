@@ -1,12 +1,6 @@
 -- YTEmpire Redis Initialization Script
 -- Sets up initial cache structures and Lua scripts
 
--- Initialize cache statistics
-redis.call('HSET', 'yt:cache:stats', 'hits', 0)
-redis.call('HSET', 'yt:cache:stats', 'misses', 0)
-redis.call('HSET', 'yt:cache:stats', 'total_requests', 0)
-redis.call('HSET', 'yt:cache:stats', 'initialized_at', os.time())
-
 -- Create cache namespaces documentation
 redis.call('SET', 'yt:namespaces:doc', [[
 YTEmpire Cache Namespaces:
@@ -16,6 +10,8 @@ YTEmpire Cache Namespaces:
 - session:{id} - User session data (1hr TTL)
 - rate:{user}:{endpoint} - Rate limiting counters (1min TTL)
 - cache:query:{hash} - Query result cache (5min TTL)
+- yt:lb:{scope}:{all|day:YYYY-MM-DD|Nd} - View leaderboards (day sets 32d TTL, windows 1min TTL)
+- yt:analytics:hll-{entity}-{dimension}:{id}:{YYYY-MM-DD|YYYY-MM} - HyperLogLog distinct-count sketches (days 400d TTL, month rollups 3y TTL)
 ]])
 
 -- Rate limiting script
@@ -78,16 +74,10 @@ local cache_update_script = [[
 local key = KEYS[1]
 local value = ARGV[1]
 local ttl = tonumber(ARGV[2])
-local update_stats = ARGV[3] == "true"
 
 -- Set the value with TTL
 redis.call('SETEX', key, ttl, value)
 
--- Update cache statistics if requested
-if update_stats then
-    redis.call('HINCRBY', 'yt:cache:stats', 'writes', 1)
-end
-
 -- Add to cache index for tracking
 local cache_type = string.match(key, "^([^:]+:[^:]+)")
 if cache_type then
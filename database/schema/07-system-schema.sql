@@ -28,6 +28,7 @@ CREATE TABLE system.sync_logs (
     records_updated    INTEGER DEFAULT 0,
     records_created    INTEGER DEFAULT 0,
     error_message      TEXT,
+    checkpoint         JSONB, -- Resume position for batched jobs, e.g. last migrated key
     started_at         TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     completed_at       TIMESTAMP WITH TIME ZONE,
     execution_time_ms  INTEGER
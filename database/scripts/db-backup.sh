@@ -1,6 +1,11 @@
 #!/bin/sh
 # YTEmpire Database Backup Script
 # Performs daily backups of PostgreSQL and Redis
+#
+# BACKUP_MODE=full        dump the whole database every run (default)
+# BACKUP_MODE=incremental dump the non-partitioned schemas every run, plus
+#                         only the analytics.* monthly partitions whose
+#                         watermark changed since the previous run
 
 set -e
 
@@ -8,24 +13,118 @@ set -e
 BACKUP_DIR="/backups"
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
 RETENTION_DAYS=7
+BACKUP_MODE="${BACKUP_MODE:-full}"
+PARTITION_SCHEMA="${PARTITION_SCHEMA:-analytics}"
+PARTITION_DIR="$BACKUP_DIR/partitions"
+PARTITION_STATE="$PARTITION_DIR/state.tsv"
+TAB=$(printf '\t')
 
 # Ensure backup directory exists
 mkdir -p "$BACKUP_DIR"
 
-echo "Starting YTEmpire database backup at $(date)"
+echo "Starting YTEmpire database backup at $(date) (mode: $BACKUP_MODE)"
+
+psql_query() {
+    PGPASSWORD=$POSTGRES_PASSWORD psql \
+        -h $POSTGRES_HOST \
+        -U $POSTGRES_USER \
+        -d $POSTGRES_DB \
+        -X -A -t -F "$TAB" \
+        -c "$1"
+}
 
 # PostgreSQL Backup
-echo "Backing up PostgreSQL..."
-PGPASSWORD=$POSTGRES_PASSWORD pg_dump \
-    -h $POSTGRES_HOST \
-    -U $POSTGRES_USER \
-    -d $POSTGRES_DB \
-    -Fc \
-    -f "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump"
-
-# Compress the backup
-gzip "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump"
-echo "PostgreSQL backup completed: postgresql_${TIMESTAMP}.dump.gz"
+if [ "$BACKUP_MODE" = "incremental" ]; then
+    mkdir -p "$PARTITION_DIR"
+    touch "$PARTITION_STATE"
+
+    # One row per leaf partition: name and a cheap change watermark.
+    # The watermark combines the relfilenode (changes on TRUNCATE / VACUUM FULL),
+    # the cumulative insert/update/delete counters and the time statistics were
+    # last reset, so any write to a partition produces a new value without
+    # having to read the partition itself.
+    PARTITIONS=$(psql_query "
+        SELECT n.nspname || '.' || c.relname,
+               concat_ws(':', c.relfilenode, s.n_tup_ins, s.n_tup_upd, s.n_tup_del,
+                         COALESCE(EXTRACT(EPOCH FROM d.stats_reset)::BIGINT, 0))
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_stat_user_tables s ON s.relid = c.oid
+        JOIN pg_stat_database d ON d.datname = current_database()
+        WHERE n.nspname = '$PARTITION_SCHEMA' AND c.relkind = 'r'
+        ORDER BY 1;")
+
+    # Base backup: every schema object plus the data of all non-partitioned
+    # tables. Partition data is excluded and captured per partition below.
+    EXCLUDE_ARGS=""
+    for PARTITION in $(echo "$PARTITIONS" | cut -f1); do
+        EXCLUDE_ARGS="$EXCLUDE_ARGS --exclude-table-data=$PARTITION"
+    done
+
+    echo "Backing up PostgreSQL base (schema + non-partitioned data)..."
+    PGPASSWORD=$POSTGRES_PASSWORD pg_dump \
+        -h $POSTGRES_HOST \
+        -U $POSTGRES_USER \
+        -d $POSTGRES_DB \
+        -Fc \
+        $EXCLUDE_ARGS \
+        -f "$BACKUP_DIR/postgresql_base_${TIMESTAMP}.dump"
+
+    gzip "$BACKUP_DIR/postgresql_base_${TIMESTAMP}.dump"
+    PG_BACKUP="postgresql_base_${TIMESTAMP}.dump.gz"
+    echo "PostgreSQL base backup completed: $PG_BACKUP"
+
+    # Restore set: base first, then the latest snapshot of every partition
+    echo "$PG_BACKUP" > "$BACKUP_DIR/backup_${TIMESTAMP}.files"
+
+    NEW_STATE="$PARTITION_STATE.$TIMESTAMP"
+    : > "$NEW_STATE"
+
+    echo "$PARTITIONS" | while IFS="$TAB" read -r PARTITION WATERMARK; do
+        [ -n "$PARTITION" ] || continue
+
+        PREVIOUS=$(awk -F "$TAB" -v p="$PARTITION" '$1 == p' "$PARTITION_STATE")
+        PREVIOUS_WATERMARK=$(echo "$PREVIOUS" | cut -f2)
+        SNAPSHOT=$(echo "$PREVIOUS" | cut -f3)
+
+        if [ -z "$SNAPSHOT" ] || [ ! -f "$BACKUP_DIR/$SNAPSHOT" ] || [ "$PREVIOUS_WATERMARK" != "$WATERMARK" ]; then
+            SNAPSHOT="partitions/${PARTITION}/${TIMESTAMP}.dump"
+            mkdir -p "$PARTITION_DIR/$PARTITION"
+            PGPASSWORD=$POSTGRES_PASSWORD pg_dump \
+                -h $POSTGRES_HOST \
+                -U $POSTGRES_USER \
+                -d $POSTGRES_DB \
+                -Fc \
+                --data-only \
+                -t "$PARTITION" \
+                -f "$BACKUP_DIR/$SNAPSHOT"
+            echo "  dumped   $PARTITION"
+        else
+            echo "  skipped  $PARTITION (unchanged since $(basename "$SNAPSHOT" .dump))"
+        fi
+
+        printf '%s\t%s\t%s\n' "$PARTITION" "$WATERMARK" "$SNAPSHOT" >> "$NEW_STATE"
+        echo "$SNAPSHOT" >> "$BACKUP_DIR/backup_${TIMESTAMP}.files"
+    done
+
+    mv "$NEW_STATE" "$PARTITION_STATE"
+    echo "PostgreSQL partition snapshots completed: $(grep -c "/${TIMESTAMP}.dump" "$PARTITION_STATE" || true) of $(wc -l < "$PARTITION_STATE") partitions dumped"
+else
+    echo "Backing up PostgreSQL..."
+    PGPASSWORD=$POSTGRES_PASSWORD pg_dump \
+        -h $POSTGRES_HOST \
+        -U $POSTGRES_USER \
+        -d $POSTGRES_DB \
+        -Fc \
+        -f "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump"
+
+    # Compress the backup
+    gzip "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump"
+    PG_BACKUP="postgresql_${TIMESTAMP}.dump.gz"
+    echo "$PG_BACKUP" > "$BACKUP_DIR/backup_${TIMESTAMP}.files"
+    echo "PostgreSQL backup completed: $PG_BACKUP"
+fi
 
 # Redis Backup
 echo "Backing up Redis..."
@@ -45,14 +144,74 @@ fi
 
 # Clean up old backups
 echo "Cleaning up old backups..."
-find $BACKUP_DIR -name "*.gz" -type f -mtime +$RETENTION_DAYS -exec rm {} \;
+# Restore sets and metadata go with the base dumps they point at
+find $BACKUP_DIR -maxdepth 1 -type f -mtime +$RETENTION_DAYS \
+    \( -name "*.gz" -o -name "backup_*.files" -o -name "backup_*.json" \) -exec rm {} \;
+
+# Partition snapshots are only removed once they are past retention and no
+# longer referenced: not the latest of their partition (kept forever while
+# unchanged) and not part of any restore set that survived the prune above.
+if [ -f "$PARTITION_STATE" ]; then
+    KEEP_LIST=$(mktemp)
+    cut -f3 "$PARTITION_STATE" > "$KEEP_LIST"
+    for RESTORE_SET in "$BACKUP_DIR"/backup_*.files; do
+        [ -f "$RESTORE_SET" ] && cat "$RESTORE_SET" >> "$KEEP_LIST"
+    done
+
+    find "$PARTITION_DIR" -name "*.dump" -type f -mtime +$RETENTION_DAYS | while read -r OLD_SNAPSHOT; do
+        if ! grep -qxF "${OLD_SNAPSHOT#$BACKUP_DIR/}" "$KEEP_LIST"; then
+            rm "$OLD_SNAPSHOT"
+        fi
+    done
+    rm -f "$KEEP_LIST"
+    find "$PARTITION_DIR" -mindepth 1 -type d -empty -delete
+fi
+
+# Every retained restore set must still be restorable: all of its pieces are
+# present, and those of the oldest set (the first to lose pieces to a bad
+# prune) still read as pg_restore archives
+echo "Verifying retained restore sets..."
+OLDEST_SET=$(ls "$BACKUP_DIR"/backup_*.files 2>/dev/null | head -n 1)
+BROKEN_SETS=0
+for RESTORE_SET in "$BACKUP_DIR"/backup_*.files; do
+    [ -f "$RESTORE_SET" ] || continue
+    while read -r BACKUP_FILE; do
+        if [ ! -f "$BACKUP_DIR/$BACKUP_FILE" ]; then
+            echo "Error: $(basename "$RESTORE_SET") is missing $BACKUP_FILE"
+            BROKEN_SETS=$((BROKEN_SETS + 1))
+        elif [ "$RESTORE_SET" = "$OLDEST_SET" ]; then
+            case "$BACKUP_FILE" in
+                *.gz) gunzip -c "$BACKUP_DIR/$BACKUP_FILE" | pg_restore --list > /dev/null ;;
+                *) pg_restore --list "$BACKUP_DIR/$BACKUP_FILE" > /dev/null ;;
+            esac || {
+                echo "Error: $(basename "$RESTORE_SET"): $BACKUP_FILE is not a readable archive"
+                BROKEN_SETS=$((BROKEN_SETS + 1))
+            }
+        fi
+    done < "$RESTORE_SET"
+done
+if [ "$BROKEN_SETS" -gt 0 ]; then
+    echo "Error: $BROKEN_SETS problem(s) in retained restore sets"
+    exit 1
+fi
+echo "Oldest retained restore set: $(basename "${OLDEST_SET:-none}")"
 
 # Create backup metadata
+PARTITIONS_JSON=""
+if [ "$BACKUP_MODE" = "incremental" ]; then
+    PARTITIONS_JSON=$(sed '1d; s/.*/        "&"/; $!s/$/,/' "$BACKUP_DIR/backup_${TIMESTAMP}.files")
+fi
+
 cat > "$BACKUP_DIR/backup_${TIMESTAMP}.json" <<EOF
 {
     "timestamp": "${TIMESTAMP}",
     "date": "$(date -Iseconds)",
-    "postgresql_backup": "postgresql_${TIMESTAMP}.dump.gz",
+    "mode": "${BACKUP_MODE}",
+    "postgresql_backup": "${PG_BACKUP}",
+    "postgresql_partitions": [
+${PARTITIONS_JSON}
+    ],
+    "restore_set": "backup_${TIMESTAMP}.files",
     "redis_backup": "redis_${TIMESTAMP}.rdb.gz",
     "retention_days": ${RETENTION_DAYS},
     "database": "${POSTGRES_DB}",
@@ -61,10 +220,12 @@ cat > "$BACKUP_DIR/backup_${TIMESTAMP}.json" <<EOF
 EOF
 
 # Calculate backup sizes
-PG_SIZE=$(stat -c%s "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump.gz" 2>/dev/null || echo "0")
+PG_SIZE=$(stat -c%s "$BACKUP_DIR/$PG_BACKUP" 2>/dev/null || echo "0")
+PARTITION_SIZE=$(find "$PARTITION_DIR" -name "${TIMESTAMP}.dump" -type f -exec stat -c%s {} \; 2>/dev/null | awk '{ s += $1 } END { print s + 0 }')
 REDIS_SIZE=$(stat -c%s "$BACKUP_DIR/redis_${TIMESTAMP}.rdb.gz" 2>/dev/null || echo "0")
 
 echo "Backup summary:"
 echo "  PostgreSQL: $(numfmt --to=iec-i --suffix=B $PG_SIZE)"
+echo "  PostgreSQL partitions (new): $(numfmt --to=iec-i --suffix=B $PARTITION_SIZE)"
 echo "  Redis: $(numfmt --to=iec-i --suffix=B $REDIS_SIZE)"
-echo "Backup process completed at $(date)"
\ No newline at end of file
+echo "Backup process completed at $(date)"
@@ -0,0 +1,66 @@
+#!/bin/sh
+# YTEmpire Database Restore Script
+# Restores a PostgreSQL backup set written by db-backup.sh (full or incremental)
+#
+# Usage: db-restore.sh <TIMESTAMP>
+# The restore set backup_<TIMESTAMP>.files lists the base dump first, followed
+# by the latest data snapshot of every partition at the time of that backup.
+
+set -e
+
+# Configuration
+BACKUP_DIR="/backups"
+TIMESTAMP="$1"
+
+if [ -z "$TIMESTAMP" ]; then
+    echo "Usage: $0 <TIMESTAMP>"
+    echo ""
+    echo "Available backup sets:"
+    ls "$BACKUP_DIR"/backup_*.files 2>/dev/null | sed 's/.*backup_\(.*\)\.files/  \1/' || echo "  No backups found"
+    exit 1
+fi
+
+RESTORE_SET="$BACKUP_DIR/backup_${TIMESTAMP}.files"
+if [ ! -f "$RESTORE_SET" ]; then
+    # Backups taken before restore sets existed are a single full dump
+    if [ -f "$BACKUP_DIR/postgresql_${TIMESTAMP}.dump.gz" ]; then
+        RESTORE_SET=$(mktemp)
+        echo "postgresql_${TIMESTAMP}.dump.gz" > "$RESTORE_SET"
+    else
+        echo "Error: No backup set found for $TIMESTAMP"
+        exit 1
+    fi
+fi
+
+# Fail before touching the database if any piece of the set is missing
+while read -r BACKUP_FILE; do
+    if [ ! -f "$BACKUP_DIR/$BACKUP_FILE" ]; then
+        echo "Error: Backup file missing from set: $BACKUP_FILE"
+        exit 1
+    fi
+done < "$RESTORE_SET"
+
+echo "Starting YTEmpire database restore of $TIMESTAMP at $(date)"
+
+BASE_BACKUP=$(head -n 1 "$RESTORE_SET")
+echo "Restoring PostgreSQL base: $BASE_BACKUP"
+gunzip -c "$BACKUP_DIR/$BASE_BACKUP" | PGPASSWORD=$POSTGRES_PASSWORD pg_restore \
+    -h $POSTGRES_HOST \
+    -U $POSTGRES_USER \
+    -d $POSTGRES_DB \
+    --clean \
+    --if-exists \
+    --no-owner
+
+tail -n +2 "$RESTORE_SET" | while read -r SNAPSHOT; do
+    echo "  restoring $SNAPSHOT"
+    PGPASSWORD=$POSTGRES_PASSWORD pg_restore \
+        -h $POSTGRES_HOST \
+        -U $POSTGRES_USER \
+        -d $POSTGRES_DB \
+        --data-only \
+        --no-owner \
+        "$BACKUP_DIR/$SNAPSHOT"
+done
+
+echo "Restore process completed at $(date)"
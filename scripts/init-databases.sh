@@ -126,7 +126,7 @@ verify_setup() {
     fi
     
     # Check Redis
-    REDIS_CHECK=$(docker-compose -f docker-compose.db.yml exec -T redis redis-cli EXISTS yt:cache:stats 2>/dev/null || echo "0")
+    REDIS_CHECK=$(docker-compose -f docker-compose.db.yml exec -T redis redis-cli EXISTS yt:config 2>/dev/null || echo "0")
     
     if [ "$REDIS_CHECK" = "1" ]; then
         echo "✅ Redis initialized successfully"
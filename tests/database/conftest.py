@@ -0,0 +1,127 @@
+"""
+PostgreSQL test fixtures for YTEmpire MVP
+Builds database/schema/*.sql once into a template database and clones a
+private database per test worker with CREATE DATABASE ... TEMPLATE
+
+Run the database suite in parallel with pytest-xdist:
+    pip install pytest-xdist
+    pytest tests/database -n auto
+Without it, leave out -n and the suite runs in a single process.
+"""
+
+import glob
+import hashlib
+import os
+import uuid
+
+import psycopg2
+import pytest
+
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'schema')
+TEMPLATE_DB = os.getenv('POSTGRES_TEMPLATE_DB', 'ytempire_test_template')
+
+# Advisory lock key serialising template builds across workers and runs
+TEMPLATE_LOCK_KEY = 0x59544550
+
+
+def base_connection_params():
+    """Connection parameters for the test user, from the environment"""
+    return {
+        'host': os.getenv('POSTGRES_HOST', 'localhost'),
+        'port': os.getenv('POSTGRES_PORT', 5432),
+        'database': os.getenv('POSTGRES_DB', 'ytempire_dev'),
+        'user': os.getenv('POSTGRES_USER', 'ytempire_user'),
+        'password': os.getenv('POSTGRES_PASSWORD', 'ytempire_pass')
+    }
+
+
+def admin_connection_params():
+    """Connection parameters allowed to create extensions and databases"""
+    params = base_connection_params()
+    params['user'] = os.getenv('POSTGRES_ADMIN_USER', params['user'])
+    params['password'] = os.getenv('POSTGRES_ADMIN_PASSWORD', params['password'])
+    params['database'] = os.getenv('POSTGRES_ADMIN_DB', 'postgres')
+    return params
+
+
+def schema_files():
+    return sorted(glob.glob(os.path.join(SCHEMA_DIR, '*.sql')))
+
+
+def schema_fingerprint():
+    """Hash of the schema files; the template is rebuilt whenever it changes"""
+    digest = hashlib.sha256()
+    for path in schema_files():
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def ensure_template():
+    """Build the template database unless one with the current schema exists"""
+    admin = admin_connection_params()
+    fingerprint = schema_fingerprint()
+
+    conn = psycopg2.connect(**admin)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s);", (TEMPLATE_LOCK_KEY,))
+            try:
+                cursor.execute("""
+                    SELECT shobj_description(oid, 'pg_database')
+                    FROM pg_database WHERE datname = %s;
+                """, (TEMPLATE_DB,))
+                row = cursor.fetchone()
+                if row and row[0] == fingerprint:
+                    return
+
+                if row:
+                    cursor.execute(f'ALTER DATABASE "{TEMPLATE_DB}" WITH IS_TEMPLATE false;')
+                    cursor.execute(f'DROP DATABASE "{TEMPLATE_DB}" WITH (FORCE);')
+                cursor.execute(f'CREATE DATABASE "{TEMPLATE_DB}";')
+
+                template = psycopg2.connect(**{**admin, 'database': TEMPLATE_DB})
+                try:
+                    with template.cursor() as template_cursor:
+                        for path in schema_files():
+                            with open(path, 'r') as f:
+                                template_cursor.execute(f.read())
+                    template.commit()
+                finally:
+                    template.close()
+
+                # Refuse connections so concurrent clones never see it as busy
+                cursor.execute(f"COMMENT ON DATABASE \"{TEMPLATE_DB}\" IS %s;", (fingerprint,))
+                cursor.execute(f'ALTER DATABASE "{TEMPLATE_DB}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false;')
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s);", (TEMPLATE_LOCK_KEY,))
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope='session')
+def test_database():
+    """Connection parameters for a database cloned from the template for this worker"""
+    ensure_template()
+
+    params = base_connection_params()
+    worker = os.getenv('PYTEST_XDIST_WORKER', 'main')
+    params['database'] = f"ytempire_test_{worker}_{uuid.uuid4().hex[:8]}"
+
+    admin = psycopg2.connect(**admin_connection_params())
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(
+                f'CREATE DATABASE "{params["database"]}" TEMPLATE "{TEMPLATE_DB}" OWNER "{params["user"]}";'
+            )
+
+        yield params
+
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{params["database"]}" WITH (FORCE);')
+    finally:
+        admin.close()
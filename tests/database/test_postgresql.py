@@ -4,7 +4,12 @@ Tests database connectivity, schema validation, performance, and data integrity
 """
 
 import os
+import sys
 import time
+import asyncio
+import shutil
+import subprocess
+import tempfile
 import pytest
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -14,24 +19,47 @@ import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import statistics
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'scripts'))
+
 
 class TestPostgreSQLDatabase:
     """Comprehensive PostgreSQL database tests"""
     
-    @classmethod
-    def setup_class(cls):
-        """Setup database connection for tests"""
-        cls.connection_params = {
-            'host': os.getenv('POSTGRES_HOST', 'localhost'),
-            'port': os.getenv('POSTGRES_PORT', 5432),
-            'database': os.getenv('POSTGRES_DB', 'ytempire_dev'),
-            'user': os.getenv('POSTGRES_USER', 'ytempire_user'),
-            'password': os.getenv('POSTGRES_PASSWORD', 'ytempire_pass')
-        }
+    @pytest.fixture(autouse=True)
+    def setup_database(self, test_database):
+        """Point every test at this worker's database cloned from the schema template"""
+        self.connection_params = test_database
         
     def get_connection(self):
         """Get a new database connection"""
         return psycopg2.connect(**self.connection_params)
+
+    def get_database_url(self, database=None, host=None, port=None):
+        """URL of the test database for the asyncpg/SQLAlchemy based scripts"""
+        params = self.connection_params
+        return (
+            f"postgresql://{params['user']}:{params['password']}"
+            f"@{host or params['host']}:{port or params['port']}/{database or params['database']}"
+        )
+    
+    def get_redis_url(self):
+        """Redis URL for the cache-backed scripts; skips the test when Redis is unreachable"""
+        import redis.asyncio as redis
+
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/15')
+
+        async def ping():
+            client = redis.from_url(redis_url)
+            try:
+                return await client.ping()
+            except (OSError, redis.RedisError):
+                return False
+            finally:
+                await client.aclose()
+
+        if not asyncio.run(ping()):
+            pytest.skip(f"Redis not reachable at {redis_url}")
+        return redis_url
     
     def test_database_connection(self):
         """Test basic database connectivity"""
@@ -260,6 +288,498 @@ class TestPostgreSQLDatabase:
             
             assert len(results) == 20, "Not all concurrent connections completed"
     
+    def test_pool_sizing_sweep(self):
+        """Test the dashboard load generator measures every pool size and finds a knee"""
+        from db_loadtest import DatabaseLoadTester
+
+        database_url = self.get_database_url()
+        tester = DatabaseLoadTester(database_url)
+
+        async def run():
+            server = await tester.prepare(sample_size=20)
+            steps = await tester.sweep([8], [2, 4, 8], duration=1.0, warmup=0.2)
+            return server, steps
+
+        server, steps = asyncio.run(run())
+
+        assert server['max_connections'] >= 20
+        assert [s['pool_size'] for s in steps] == [2, 4, 8]
+        for step in steps:
+            assert step['queries'] > 0, f"No queries completed with pool size {step['pool_size']}"
+            assert not step['errors'], f"Query errors during load test: {step['errors']}"
+
+        knee = tester.find_knee(steps)
+        assert knee['pool_size'] in (2, 4, 8)
+        print(f"Pool knee: size={knee['pool_size']}, {knee['throughput_qps']} qps")
+
+    def test_search_keyset_pagination(self):
+        """Test ranked search pages are disjoint, ordered and served by the GIN index"""
+        from db_search import SearchService
+
+        database_url = self.get_database_url()
+        service = SearchService(database_url)
+
+        async def run():
+            await service.connect()
+            try:
+                await service.seed_videos(500)
+                pages = []
+                cursor = None
+                while True:
+                    page = await service.search('videos', 'Gaming  Tutorial', limit=25, cursor=cursor)
+                    pages.append(page)
+                    cursor = page['next_cursor']
+                    if not cursor:
+                        break
+                plan = await service.explain('videos', 'gaming tutorial', force_index=True)
+                return pages, plan
+            finally:
+                await service.disconnect()
+
+        pages, plan = asyncio.run(run())
+
+        rows = [row for page in pages for row in page['results']]
+        ids = [row['video_id'] for row in rows]
+        assert rows, "Search returned no results for seeded terms"
+        assert len(ids) == len(set(ids)), "Keyset pages returned duplicate rows"
+        ranks = [row['rank'] for row in rows]
+        assert ranks == sorted(ranks, reverse=True), "Results not ordered by rank"
+        assert pages[0]['query'] == 'gaming tutorial'
+        assert plan['uses_index'], f"Search plan does not use {plan['index']}: {plan['indexes']}"
+
+    def test_search_cached_page_matches_uncached(self):
+        """Test a page served from the Redis cache is identical to the same page from Postgres"""
+        from db_search import SearchService
+
+        service = SearchService(self.get_database_url(), self.get_redis_url(), cache_ttl=30)
+
+        async def run():
+            await service.connect()
+            try:
+                await service.seed_videos(200)
+                key = service.cache_key('videos', 'gaming tutorial', None, 10)
+                await service.client.delete(key)
+                first = await service.search('videos', 'gaming tutorial', limit=10)
+                uncached = await service.search('videos', 'gaming tutorial', limit=10, use_cache=False)
+                cached = await service.search('videos', 'gaming tutorial', limit=10)
+                next_uncached = await service.search('videos', 'gaming tutorial', limit=10,
+                                                     cursor=cached['next_cursor'], use_cache=False)
+                await service.client.delete(key)
+                return first, uncached, cached, next_uncached
+            finally:
+                await service.disconnect()
+
+        first, uncached, cached, next_uncached = asyncio.run(run())
+
+        assert uncached['results'], "Search returned no results for seeded terms"
+        assert cached['cached'] is True and uncached['cached'] is False
+        assert {**cached, 'cached': False} == uncached
+        assert first == uncached
+        # A cursor taken from a cached page continues the same ordering
+        assert next_uncached['results'][0]['rank'] <= cached['results'][-1]['rank']
+        assert not {r['video_id'] for r in next_uncached['results']} & {r['video_id'] for r in cached['results']}
+        json.dumps(uncached)
+
+    def test_replica_routing(self):
+        """Test reads go to a replica within the lag bound and fall back to the primary otherwise
+
+        Set POSTGRES_REPLICA_HOST/POSTGRES_REPLICA_PORT to a streaming replica of the
+        test server to exercise replica reads; without one only the fallbacks are tested.
+        """
+        from db_router import ReplicaRouter
+
+        primary_url = self.get_database_url()
+
+        async def run(replica_url, reads):
+            router = ReplicaRouter(primary_url, [replica_url], check_interval=0.2)
+            await router.start()
+            try:
+                for max_lag in reads:
+                    assert await router.fetchval("SELECT 1", max_lag=max_lag) == 1
+                return dict(router.routed), router.status()
+            finally:
+                await router.close()
+
+        # A node that is not in recovery is never treated as a replica
+        routed, status = asyncio.run(run(primary_url, [60, 60]))
+        assert routed == {'primary': 2}
+        assert status[1]['in_recovery'] is False and not status[1]['eligible']
+
+        replica_host = os.getenv('POSTGRES_REPLICA_HOST')
+        if not replica_host:
+            return
+        replica_url = self.get_database_url(host=replica_host, port=os.getenv('POSTGRES_REPLICA_PORT', 5433))
+        routed, status = asyncio.run(run(replica_url, [60, 60, 0]))
+        assert status[1]['in_recovery'] is True
+        assert routed == {'replica1': 2, 'primary': 1}, f"Unexpected routing: {routed}"
+
+    def test_replica_routing_disconnected_stream(self):
+        """Test a replica whose WAL stream is down stops taking reads once the primary moves on
+
+        Needs POSTGRES_REPLICA_HOST and admin credentials allowed to ALTER SYSTEM on the replica.
+        """
+        replica_host = os.getenv('POSTGRES_REPLICA_HOST')
+        if not replica_host:
+            pytest.skip("POSTGRES_REPLICA_HOST not set")
+
+        from conftest import admin_connection_params
+        from db_router import ReplicaRouter
+
+        primary_url = self.get_database_url()
+        replica_port = os.getenv('POSTGRES_REPLICA_PORT', 5433)
+        replica_url = self.get_database_url(host=replica_host, port=replica_port)
+
+        admin = psycopg2.connect(**{**admin_connection_params(), 'host': replica_host, 'port': replica_port})
+        admin.autocommit = True
+
+        def wal_receivers(cursor):
+            cursor.execute("SELECT COUNT(*) FROM pg_stat_wal_receiver;")
+            return cursor.fetchone()[0]
+
+        async def run():
+            router = ReplicaRouter(primary_url, [replica_url], check_interval=0.2)
+            await router.start()
+            try:
+                # Idle primary, live stream: the replica is current
+                await router.check_lag()
+                assert await router.fetchval("SELECT 1", max_lag=5) == 1
+                assert router.routed == {'replica1': 1}
+
+                # Cut the stream, then commit on the primary so the replica falls behind
+                with admin.cursor() as cursor:
+                    cursor.execute("ALTER SYSTEM SET primary_conninfo = '';")
+                    cursor.execute("SELECT pg_reload_conf();")
+                    deadline = time.time() + 10
+                    while wal_receivers(cursor) and time.time() < deadline:
+                        time.sleep(0.1)
+                    assert not wal_receivers(cursor), "WAL receiver did not stop"
+                await router.execute("CREATE TABLE replica_lag_probe (id int); DROP TABLE replica_lag_probe;")
+
+                await asyncio.sleep(1.5)
+                await router.check_lag()
+                replica = router.status()[1]
+                assert replica['lag_seconds'] is not None and replica['lag_seconds'] >= 1, \
+                    f"Disconnected replica reported as current: {replica}"
+                assert await router.fetchval("SELECT 1", max_lag=1) == 1
+                assert router.routed['primary'] == 1
+                assert router.fallbacks['lag'] == 1
+            finally:
+                await router.close()
+
+        with admin.cursor() as cursor:
+            cursor.execute("SHOW primary_conninfo;")
+            primary_conninfo = cursor.fetchone()[0]
+        try:
+            asyncio.run(run())
+        finally:
+            with admin.cursor() as cursor:
+                cursor.execute("ALTER SYSTEM SET primary_conninfo = %s;", (primary_conninfo,))
+                cursor.execute("SELECT pg_reload_conf();")
+            admin.close()
+
+    def test_campaign_metrics_recompute(self):
+        """Test the bulk campaign metrics engine upserts ROI, CPV and engagement per day"""
+        from db_campaign_metrics import CampaignMetricsEngine
+
+        database_url = self.get_database_url()
+        # Initial analytics partitions start at the current month
+        month_start = datetime.now().date().replace(day=1)
+        suffix = uuid.uuid4().hex[:8]
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO users.accounts (email, username, password_hash, account_type)
+                    VALUES (%s, %s, 'hash', 'creator') RETURNING account_id;
+                """, (f'campaign_{suffix}@ytempire.test', f'campaign_{suffix}'))
+                account_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO content.channels (account_id, youtube_channel_id, channel_name)
+                    VALUES (%s, %s, 'Campaign Channel') RETURNING channel_id;
+                """, (account_id, f'UC_campaign_{suffix}'))
+                channel_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO content.videos (channel_id, youtube_video_id, title, privacy_status)
+                    VALUES (%s, %s, 'Campaign Video', 'public') RETURNING video_id;
+                """, (channel_id, f'v_campaign_{suffix}'))
+                video_id = cursor.fetchone()[0]
+                # 100 budget over 20 days spends 5 per day
+                cursor.execute("""
+                    INSERT INTO campaigns.campaigns
+                        (account_id, campaign_name, campaign_type, start_date, end_date, budget, status)
+                    VALUES (%s, 'Metrics Test', 'promotion', %s, %s, 100, 'active') RETURNING campaign_id;
+                """, (account_id, month_start - timedelta(days=5), month_start + timedelta(days=14)))
+                campaign_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO campaigns.campaign_videos (campaign_id, video_id) VALUES (%s, %s);
+                """, (campaign_id, video_id))
+                cursor.execute("""
+                    INSERT INTO analytics.video_analytics
+                        (video_id, date, views, estimated_revenue, likes, comments, shares)
+                    SELECT %s, %s::date + i, 1000, 10.00, 30, 10, 10 FROM generate_series(0, 2) AS i;
+                """, (video_id, month_start))
+            conn.commit()
+
+            engine = CampaignMetricsEngine(database_url)
+            report = asyncio.run(engine.recompute(
+                month_start, month_start + timedelta(days=2), ['active'], str(campaign_id)
+            ))
+            assert report['campaigns'] == 1
+            assert report['rows'] == 3
+
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT total_views, cost_per_view, return_on_investment, engagement_rate
+                    FROM campaigns.campaign_performance WHERE campaign_id = %s ORDER BY date;
+                """, (campaign_id,))
+                rows = cursor.fetchall()
+
+            assert len(rows) == 3
+            for row in rows:
+                assert row['total_views'] == 1000
+                assert float(row['cost_per_view']) == pytest.approx(0.005)
+                assert float(row['return_on_investment']) == pytest.approx(1.0)
+                assert float(row['engagement_rate']) == pytest.approx(0.05)
+            assert report['latest'][0]['return_on_investment_7d'] == pytest.approx(1.0)
+
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_leaderboard_sync_backdated_rows(self):
+        """Test a sync picks up analytics rows written after the last sync for earlier days
+
+        Uses REDIS_URL (database 15 by default); skipped when Redis is unreachable.
+        """
+        from redis_leaderboard import KEY_PREFIX, LeaderboardManager
+
+        redis_url = self.get_redis_url()
+        database_url = self.get_database_url()
+        today = datetime.now().date()
+        backdated = today - timedelta(days=3)
+        suffix = uuid.uuid4().hex[:8]
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT create_monthly_partition('video_analytics', date_trunc('month', %s::date)::date);",
+                               (backdated,))
+                cursor.execute("SELECT create_monthly_partition('channel_analytics', date_trunc('month', %s::date)::date);",
+                               (backdated,))
+                cursor.execute("""
+                    INSERT INTO users.accounts (email, username, password_hash, account_type)
+                    VALUES (%s, %s, 'hash', 'creator') RETURNING account_id;
+                """, (f'leaderboard_{suffix}@ytempire.test', f'leaderboard_{suffix}'))
+                account_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO content.channels (account_id, youtube_channel_id, channel_name, status, last_sync_at)
+                    VALUES (%s, %s, 'Leaderboard Channel', 'active', NOW()) RETURNING channel_id;
+                """, (account_id, f'UC_leaderboard_{suffix}'))
+                channel_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO content.videos (channel_id, youtube_video_id, title, privacy_status, view_count, last_sync_at)
+                    VALUES (%s, %s, 'Leaderboard Video', 'public', 1000, NOW()) RETURNING video_id;
+                """, (channel_id, f'v_leaderboard_{suffix}'))
+                video_id = cursor.fetchone()[0]
+            conn.commit()
+
+            async def run():
+                manager = LeaderboardManager(redis_url, database_url)
+                await manager.connect()
+                try:
+                    await manager.sync(datetime.now().astimezone() - timedelta(minutes=5))
+
+                    # A day reported late: written now, dated before the last sync
+                    second_since = datetime.now().astimezone()
+                    with conn.cursor() as cursor:
+                        cursor.execute("""
+                            INSERT INTO analytics.video_analytics (video_id, date, views) VALUES (%s, %s, 500);
+                        """, (video_id, backdated))
+                        cursor.execute("""
+                            INSERT INTO analytics.channel_analytics (channel_id, date, views) VALUES (%s, %s, 500);
+                        """, (channel_id, backdated))
+                    conn.commit()
+
+                    second = await manager.sync(second_since)
+                    return (second, await manager.top('videos', window=7, limit=100),
+                            await manager.top('channels', window=7, limit=100))
+                finally:
+                    keys = [k async for k in manager.client.scan_iter(match=f"{KEY_PREFIX}:*", count=1000)]
+                    if keys:
+                        await manager.client.unlink(*keys)
+                    await manager.disconnect()
+
+            second, videos, channels = asyncio.run(run())
+            assert second['video_days'] >= 1 and second['channel_days'] >= 1
+            assert (str(video_id), 500) in videos, f"Back-dated video views missing: {videos}"
+            assert (str(channel_id), 500) in channels, f"Back-dated channel views missing: {channels}"
+
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_migration_resume_after_interrupt(self):
+        """Test an interrupted backfill resumes from its checkpoints and rebuilds the dropped indexes
+
+        The resumed run keeps indexes, which must still rebuild the ones the
+        interrupted run dropped.
+        """
+        import db_migrate
+        from db_migrate import MigrationRunner, unit_id, unit_scope
+
+        database_url = self.get_database_url()
+        # Analytics partitions are created by the runner; the current month always exists
+        month = datetime.now().date().replace(day=1)
+        analytics_unit = unit_id('analytics.video_analytics', unit_scope(month))
+        user_ids = [uuid.uuid4() for _ in range(20)]
+        video_ids = [uuid.uuid4() for _ in range(20)]
+        days = 3
+
+        conn = self.get_connection()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE SCHEMA ytempire;
+                    CREATE TABLE ytempire.users (
+                        id UUID PRIMARY KEY, email VARCHAR(255), username VARCHAR(100),
+                        password_hash VARCHAR(255), first_name VARCHAR(100), last_name VARCHAR(100),
+                        avatar_url VARCHAR(500), role VARCHAR(50), is_active BOOLEAN,
+                        email_verified BOOLEAN, created_at TIMESTAMPTZ, updated_at TIMESTAMPTZ
+                    );
+                    CREATE TABLE ytempire.channels (
+                        id UUID PRIMARY KEY, user_id UUID, youtube_channel_id VARCHAR(100),
+                        name VARCHAR(255), description TEXT, thumbnail_url VARCHAR(500),
+                        is_active BOOLEAN, created_at TIMESTAMPTZ, updated_at TIMESTAMPTZ
+                    );
+                    CREATE TABLE ytempire.videos (
+                        id UUID PRIMARY KEY, channel_id UUID, youtube_video_id VARCHAR(100),
+                        title VARCHAR(500), description TEXT, tags TEXT[], thumbnail_url VARCHAR(500),
+                        duration INTEGER, published_at TIMESTAMPTZ, status VARCHAR(50),
+                        created_at TIMESTAMPTZ, updated_at TIMESTAMPTZ
+                    );
+                    CREATE TABLE ytempire.analytics (
+                        video_id UUID, date DATE, views BIGINT, watch_time BIGINT,
+                        likes INTEGER, comments INTEGER, created_at TIMESTAMPTZ
+                    );
+                """)
+                for i, (user_id, video_id) in enumerate(zip(user_ids, video_ids)):
+                    suffix = uuid.uuid4().hex[:8]
+                    cursor.execute("""
+                        INSERT INTO ytempire.users VALUES
+                            (%s, %s, %s, 'hash', 'Legacy', 'User', NULL, 'user', true, true, NOW(), NOW());
+                        INSERT INTO ytempire.channels VALUES
+                            (%s, %s, %s, 'Legacy Channel', NULL, NULL, true, NOW(), NOW());
+                        INSERT INTO ytempire.videos VALUES
+                            (%s, %s, %s, 'Legacy Video', NULL, ARRAY['legacy'], NULL, 600, NOW(),
+                             'published', NOW(), NOW());
+                        INSERT INTO ytempire.analytics
+                        SELECT %s, %s::date + d, 100, 6000, 5, 1, NOW() FROM generate_series(0, %s) AS d;
+                    """, (user_id, f'legacy_{suffix}@ytempire.test', f'legacy_{suffix}',
+                          user_id, user_id, f'UC_legacy_{suffix}',
+                          video_id, user_id, f'v_legacy_{suffix}',
+                          video_id, month, days - 1))
+                cursor.execute("""
+                    SELECT indexrelid::regclass::text FROM pg_index
+                    WHERE indrelid = ANY(%s::text[]::regclass[]);
+                """, ([step['target'] for step in db_migrate.MIGRATION_STEPS],))
+                indexes_before = {row[0] for row in cursor.fetchall()}
+
+            def analytics_progress():
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT records_processed FROM system.sync_logs
+                        WHERE entity_type = 'migration' AND entity_id = %s;
+                    """, (analytics_unit,))
+                    row = cursor.fetchone()
+                    return row[0] if row else 0
+
+            async def interrupted():
+                runner = MigrationRunner(database_url, batch_size=10, workers=2, throttle_ms=100)
+                await runner.connect()
+                try:
+                    await runner.prepare()
+                    indexes = await runner.drop_secondary_indexes()
+                    task = asyncio.create_task(runner.backfill())
+                    deadline = time.time() + 30
+                    while not analytics_progress() and time.time() < deadline and not task.done():
+                        await asyncio.sleep(0.01)
+                    task.cancel()
+                    with pytest.raises(asyncio.CancelledError):
+                        await task
+                    return indexes
+                finally:
+                    await runner.disconnect()
+
+            async def resumed():
+                runner = MigrationRunner(database_url, batch_size=10, workers=2, rebuild_indexes=False)
+                await runner.connect()
+                try:
+                    await runner.prepare()
+                    indexes = await runner.drop_secondary_indexes()
+                    await runner.backfill()
+                    await runner.rebuild_secondary_indexes(indexes)
+                    return indexes, runner.results
+                finally:
+                    await runner.disconnect()
+
+            dropped = asyncio.run(interrupted())
+            done_before_resume = analytics_progress()
+            assert dropped, "No secondary indexes were dropped for the backfill"
+            assert 0 < done_before_resume < len(video_ids) * days, \
+                f"Backfill was not interrupted part way: {done_before_resume} rows"
+
+            rebuilt, results = asyncio.run(resumed())
+            assert {i['name'] for i in rebuilt} == {i['name'] for i in dropped}
+            assert any(r['skipped'] for r in results), "Completed units were run again"
+
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM users.accounts WHERE account_id = ANY(%s::uuid[]);",
+                               ([str(u) for u in user_ids],))
+                assert cursor.fetchone()[0] == len(user_ids)
+                cursor.execute("SELECT COUNT(*) FROM content.channels WHERE channel_id = ANY(%s::uuid[]);",
+                               ([str(u) for u in user_ids],))
+                assert cursor.fetchone()[0] == len(user_ids)
+                cursor.execute("SELECT COUNT(*) FROM content.videos WHERE video_id = ANY(%s::uuid[]);",
+                               ([str(v) for v in video_ids],))
+                assert cursor.fetchone()[0] == len(video_ids)
+                cursor.execute("SELECT COUNT(*) FROM analytics.video_analytics WHERE video_id = ANY(%s::uuid[]);",
+                               ([str(v) for v in video_ids],))
+                assert cursor.fetchone()[0] == len(video_ids) * days
+
+                # Resumed chunks continue the count instead of repeating rows
+                cursor.execute("""
+                    SELECT sync_status, records_processed, completed_at, execution_time_ms
+                    FROM system.sync_logs WHERE entity_type = 'migration' AND entity_id = ANY(%s::uuid[]);
+                """, ([str(analytics_unit), str(unit_id('indexes'))],))
+                for status, processed, completed_at, execution_ms in cursor.fetchall():
+                    assert status == 'completed'
+                    assert completed_at is not None and execution_ms is not None
+                assert analytics_progress() == len(video_ids) * days
+
+                cursor.execute("""
+                    SELECT indexrelid::regclass::text, indisvalid FROM pg_index
+                    WHERE indrelid = ANY(%s::text[]::regclass[]);
+                """, ([step['target'] for step in db_migrate.MIGRATION_STEPS],))
+                indexes_after = dict(cursor.fetchall())
+            assert indexes_before <= set(indexes_after), \
+                f"Indexes not rebuilt: {indexes_before - set(indexes_after)}"
+            assert all(indexes_after.values()), f"Invalid indexes after rebuild: {indexes_after}"
+
+        finally:
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM content.videos WHERE video_id = ANY(%s::uuid[]);",
+                               ([str(v) for v in video_ids],))
+                cursor.execute("DELETE FROM content.channels WHERE channel_id = ANY(%s::uuid[]);",
+                               ([str(u) for u in user_ids],))
+                cursor.execute("DELETE FROM users.accounts WHERE account_id = ANY(%s::uuid[]);",
+                               ([str(u) for u in user_ids],))
+                cursor.execute("DELETE FROM system.sync_logs WHERE entity_type = 'migration';")
+                cursor.execute("DROP SCHEMA IF EXISTS ytempire CASCADE;")
+            conn.close()
+
     def test_transaction_isolation(self):
         """Test ACID compliance and transaction isolation"""
         conn1 = self.get_connection()
@@ -329,6 +849,135 @@ class TestPostgreSQLDatabase:
         finally:
             conn.close()
     
+    def test_table_health_report(self):
+        """Test the fleet-wide health scan covers tables and leaf partitions with effective settings"""
+        from db_debug import DatabaseDebugger
+
+        database_url = self.get_database_url()
+        debugger = DatabaseDebugger(database_url)
+        debugger.engine.echo = False
+
+        report = asyncio.run(debugger.table_health())
+        tables = {entry['table']: entry for entry in report['tables']}
+
+        assert 'content.videos' in tables
+        assert any(entry['parent'] == 'analytics.video_analytics' for entry in report['tables']), \
+            "Leaf partitions missing from health report"
+        videos = tables['content.videos']
+        assert videos['autovacuum_settings']['autovacuum_vacuum_scale_factor'] is not None
+        assert {i['index'] for i in videos['indexes']} >= {'idx_videos_search'}
+        assert report['tables_flagged'] == sum(1 for entry in report['tables'] if entry['flags'])
+        json.dumps(report, default=str)
+
+    def test_export_roundtrip(self):
+        """Test CSV and Parquet exports read back with numeric, timestamptz, array, jsonb and NULL values"""
+        import csv
+        from decimal import Decimal
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from db_debug import DatabaseDebugger
+
+        query = """
+            SELECT i AS id,
+                   (i * 1.25)::numeric(10,2) AS amount,
+                   i / 3.0 AS ratio,
+                   TIMESTAMPTZ '2024-01-15 10:30:00+02' + i * INTERVAL '1 hour' AS recorded_at,
+                   CASE WHEN i = 3 THEN NULL ELSE ARRAY['tag' || i, NULL, 'shared'] END AS tags,
+                   jsonb_build_object('n', i, 'even', i % 2 = 0) AS meta,
+                   CASE WHEN i % 2 = 0 THEN NULL ELSE i END AS odd
+            FROM generate_series(1, 5) AS i
+            ORDER BY i
+        """
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query)
+                columns = [d.name for d in cursor.description]
+                expected = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        debugger = DatabaseDebugger(self.get_database_url(), echo=False)
+        with tempfile.TemporaryDirectory() as workdir:
+            parquet_file = os.path.join(workdir, 'export.parquet')
+            csv_file = os.path.join(workdir, 'export.csv')
+            parquet_export = asyncio.run(debugger.export_query(query, parquet_file, 'parquet', batch_size=2))
+            csv_export = asyncio.run(debugger.export_query(query, csv_file, 'csv'))
+
+            table = pq.read_table(parquet_file)
+            with open(csv_file, newline='') as f:
+                csv_rows = list(csv.DictReader(f))
+
+        assert parquet_export['rows'] == csv_export['rows'] == len(expected) == 5
+        assert table.schema.field('amount').type == pa.decimal128(10, 2)
+        assert table.schema.field('ratio').type == pa.float64()
+        assert table.schema.field('recorded_at').type == pa.timestamp('us', tz='UTC')
+        assert table.schema.field('tags').type == pa.list_(pa.string())
+        assert table.schema.field('meta').type == pa.string()
+
+        for want, got in zip(expected, table.to_pylist()):
+            assert got['id'] == want['id']
+            assert got['amount'] == want['amount']
+            assert got['ratio'] == pytest.approx(float(want['ratio']))
+            assert got['recorded_at'] == want['recorded_at']
+            assert got['tags'] == want['tags']
+            assert json.loads(got['meta']) == want['meta']
+            assert got['odd'] == want['odd']
+
+        for want, got in zip(expected, csv_rows):
+            assert int(got['id']) == want['id']
+            assert Decimal(got['amount']) == want['amount']
+            assert Decimal(got['ratio']) == want['ratio']
+            assert datetime.fromisoformat(got['recorded_at']) == want['recorded_at']
+            assert got['tags'] == ('' if want['tags'] is None else '{tag%d,NULL,shared}' % want['id'])
+            assert json.loads(got['meta']) == want['meta']
+            assert got['odd'] == ('' if want['odd'] is None else str(want['odd']))
+
+    def test_debug_shell_session(self, capsys):
+        """Test debug shell commands return their output when captured and over the Unix socket"""
+        from debug_shell import CAPTURE_WIDTH, DebugSession, run_client, serve_socket
+
+        wide = 'x' * 150
+
+        async def run(socket_path):
+            session = DebugSession(self.get_database_url(), 'redis://localhost:6379/15', width=CAPTURE_WIDTH)
+            try:
+                captured = {
+                    'timing': await session.execute('timing off', capture=True),
+                    'run': await session.execute(f"run SELECT 41 + 1 AS answer, '{wide}' AS wide", capture=True),
+                    'unknown': await session.execute('frobnicate', capture=True),
+                }
+
+                server = asyncio.create_task(serve_socket(session, socket_path))
+                deadline = time.time() + 5
+                while not os.path.exists(socket_path) and time.time() < deadline:
+                    await asyncio.sleep(0.01)
+                mode = os.stat(socket_path).st_mode & 0o777
+                status = await run_client(socket_path, ['run SELECT 7 * 6 AS remote', 'help'])
+                server.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await server
+                return captured, mode, status
+            finally:
+                await session.close()
+
+        with tempfile.TemporaryDirectory() as workdir:
+            socket_path = os.path.join(workdir, 'shell.sock')
+            captured, mode, status = asyncio.run(run(socket_path))
+            assert not os.path.exists(socket_path), "Socket left behind after the server stopped"
+
+        assert captured['timing'] == ''
+        assert 'answer' in captured['run'] and '42' in captured['run']
+        assert wide in captured['run'], "Captured result table was wrapped"
+        assert not any(line.endswith(' ms)') for line in captured['run'].splitlines())
+        assert "Unknown command 'frobnicate'" in captured['unknown']
+
+        assert status == 0
+        assert mode & 0o077 == 0, f"Socket is accessible to other users: {oct(mode)}"
+        client_output = capsys.readouterr().out
+        assert 'remote' in client_output
+        assert '42' in client_output and 'quit' in client_output
+
     def test_backup_restore_capability(self):
         """Test that backup and restore procedures work"""
         # This test would typically involve:
@@ -343,8 +992,8 @@ class TestPostgreSQLDatabase:
         try:
             with conn.cursor() as cursor:
                 cursor.execute("""
-                    SELECT has_database_privilege(%s, 'ytempire_dev', 'CONNECT');
-                """, (self.connection_params['user'],))
+                    SELECT has_database_privilege(%s, %s, 'CONNECT');
+                """, (self.connection_params['user'], self.connection_params['database']))
                 
                 has_access = cursor.fetchone()[0]
                 assert has_access, "User lacks database access for backups"
@@ -352,6 +1001,50 @@ class TestPostgreSQLDatabase:
         finally:
             conn.close()
     
+    def test_backup_restore_roundtrip(self):
+        """Test a dump restores in parallel, passes validation and reports phase timings"""
+        if not (shutil.which('pg_dump') and shutil.which('pg_restore')):
+            pytest.skip("pg_dump/pg_restore not available")
+
+        from db_restore import DatabaseRestorer
+
+        params = self.connection_params
+        restore_db = f"ytempire_restore_{uuid.uuid4().hex[:8]}"
+        pg_env = {**os.environ, 'PGPASSWORD': params['password']}
+
+        admin = self.get_connection()
+        admin.autocommit = True
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                dump_file = os.path.join(workdir, 'roundtrip.dump')
+                subprocess.run([
+                    'pg_dump', '-Fc',
+                    '-h', params['host'], '-p', str(params['port']),
+                    '-U', params['user'], '-d', params['database'],
+                    '-f', dump_file
+                ], env=pg_env, check=True)
+
+                with admin.cursor() as cursor:
+                    cursor.execute(f'CREATE DATABASE "{restore_db}";')
+
+                restore_url = self.get_database_url(database=restore_db)
+                restorer = DatabaseRestorer(restore_url, jobs=4)
+                asyncio.run(restorer.restore([dump_file]))
+                report = asyncio.run(restorer.validate())
+
+                failed = {name: rows for name, rows in report['checks'].items() if rows}
+                assert not failed, f"Restore validation failed: {failed}"
+                assert {'pre-data', 'data', 'post-data', 'analyze', 'validate'} <= set(restorer.timings)
+
+                print("Restore timings: " + ", ".join(
+                    f"{phase}={seconds:.2f}s" for phase, seconds in restorer.timings.items()
+                ))
+
+        finally:
+            with admin.cursor() as cursor:
+                cursor.execute(f'DROP DATABASE IF EXISTS "{restore_db}";')
+            admin.close()
+    
     def test_data_integrity_constraints(self):
         """Test foreign key constraints and data integrity"""
         conn = self.get_connection()